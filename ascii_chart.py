@@ -10,11 +10,18 @@ s numerickou proměnnou.
     chart.sort_data(sort_by="index")  # nastavení řazení
     chart.format(symbol="*")  # nastavení formátu
     chart.show()  # vypsání grafu
+
+Histogram lze vytvořit i z již sečtených četností (parametr 'weights',
+např. z hodnot a jejich počtů). Třídy počítá BinCounter jedním
+vektorovým průchodem, případně po blocích nebo po jednotlivých hodnotách.
 """
 
 
+import numpy as np
 import pandas as pd
 
+from instrumentation import timed
+
 
 def _get_col(data, x):
     # validuje dataframe inicializované instance
@@ -28,6 +35,81 @@ def _get_col(data, x):
             raise KeyError(f"No column '{x}' in '{data}' DataFrame.")
 
 
+def _round_frac(x, precision):
+    # Zaokrouhlí hranici třídy stejně jako pd.cut: čísla menší než 1 na
+    # 'precision' platných číslic, ostatní na 'precision' desetinných míst.
+    if not np.isfinite(x) or x == 0:
+        return x
+    frac, whole = np.modf(x)
+    if whole == 0:
+        digits = -int(np.floor(np.log10(abs(frac)))) - 1 + precision
+    else:
+        digits = precision
+    return np.around(x, digits)
+
+
+class BinCounter:
+    """Počítadlo četností v 'n' stejně širokých třídách.
+
+    Hranice tříd i jejich popisky odpovídají pd.cut (třídy jsou zprava
+    uzavřené, první třída je o 0.1 % rozsahu rozšířená doleva). Četnosti
+    se počítají pomocí np.bincount, lze je doplňovat po blocích (update)
+    i po jednotlivých hodnotách (add). Hodnoty mimo rozsah tříd se
+    počítají zvlášť v atributu 'outside'.
+
+    Atributy:
+        edges: pole hranic tříd (délky n + 1)
+        counts: pole četností tříd (délky n)
+        outside: počet hodnot mimo rozsah tříd
+    """
+
+    def __init__(self, low, high, n):
+        """Argumenty:
+            low, high: nejmenší a největší hodnota dat
+            n: počet tříd"""
+        if low == high:
+            delta = 0.001 * abs(low) if low != 0 else 0.001
+            self.edges = np.linspace(low - delta, high + delta, n + 1)
+        else:
+            self.edges = np.linspace(low, high, n + 1)
+            self.edges[0] -= (high - low) * 0.001
+        self.counts = np.zeros(n, dtype=np.int64)
+        self.outside = 0
+
+    def update(self, values, weights=None):
+        """Započítá pole hodnot (případně s jejich četnostmi 'weights')."""
+        values = np.asarray(values)
+        weights = (np.ones(len(values), dtype=np.int64) if weights is None
+                   else np.asarray(weights, dtype=np.int64))
+        index = np.searchsorted(self.edges, values, side="left") - 1
+        inside = (index >= 0) & (index < len(self.counts))
+        self.counts += np.bincount(index[inside], weights=weights[inside],
+                                   minlength=len(self.counts)).astype(np.int64)
+        self.outside += int(weights[~inside].sum())
+
+    def add(self, value):
+        """Započítá jednu hodnotu."""
+        index = int(np.searchsorted(self.edges, value, side="left")) - 1
+        if 0 <= index < len(self.counts):
+            self.counts[index] += 1
+        else:
+            self.outside += 1
+
+    def labels(self, precision=3):
+        """Vrátí IntervalIndex tříd s hranicemi zaokrouhlenými jako pd.cut.
+
+        Přesnost se zvyšuje, dokud nejsou všechny hranice různé."""
+        for digits in range(precision, 20):
+            breaks = [_round_frac(edge, digits) for edge in self.edges]
+            if len(np.unique(breaks)) == len(self.edges):
+                break
+        return pd.IntervalIndex.from_breaks(breaks)
+
+    def to_series(self, precision=3):
+        """Vrátí četnosti jako Series s popisky tříd v indexu."""
+        return pd.Series(self.counts, index=self.labels(precision))
+
+
 class AsciiChart:
     """Sloupcový graf vytvořený pomocí ASCII znaků.
 
@@ -124,8 +206,15 @@ class AsciiChart:
         return max(longest_col_length + longest_col_label_length + 1,
                    values_heading_len)
 
-    def _print_chart(self):
-        # vytiskne graf
+    @timed("chart.render")
+    def render(self):
+        """Vrátí graf jako string.
+
+        Vyvolává:
+            ValueError: Graf nemá žádná data.
+        """
+        if self.chart_data.empty:
+            raise ValueError("No data to chart!")
         output = []
 
         # --------------- pomocné proměnné pro správné formátování ------------
@@ -153,11 +242,18 @@ class AsciiChart:
                           f"{value // vps * str(self.symbol)} {str(value)}")
         output.append(sep)
 
-        print("\n".join(output))
+        return "\n".join(output)
+
+    def _print_chart(self):
+        # vytiskne graf
+        print(self.render())
 
     def _print_summary(self):
         # Vytiskne deskriptivní statistiky sloupce dataframe (min, mean, max)
-        return (f"Min: {self.col.min()} Mean: {self.col.mean().round(2)} "
+        weights = getattr(self, "weights", None)
+        mean = (self.col.mean() if weights is None
+                else np.average(self.col, weights=weights))
+        return (f"Min: {self.col.min()} Mean: {round(mean, 2)} "
                 f"Max: {self.col.max()}")
 
     def sort_data(self, sort_by="values", asc=True):
@@ -208,6 +304,9 @@ class Histogram(AsciiChart):
     Atributy:
         col, labels, symbol, max_symbols:
             Viz rodičovská třída AsciiChart.
+        weights:
+            Series četností hodnot ve sloupci 'col' (None = každá hodnota
+            jednou)
         chart_data:
             Series, data která má graf znázornit
             (pro histogram zdrojová data rozdělená do tříd a jejich počet)
@@ -218,12 +317,20 @@ class Histogram(AsciiChart):
             Záporný počet zančí zaokrouhlování na desítky, stovky ...
         """
 
-    def __init__(self, data, x, n=10, binwidth=None, precision=3):
-        """Inicializuje jako u základní třídy + parametry pro histogram."""
+    def __init__(self, data, x, n=10, binwidth=None, precision=3,
+                 weights=None):
+        """Inicializuje jako u základní třídy + parametry pro histogram.
+
+        Argumenty:
+            weights:
+                Název sloupce s četnostmi hodnot ve sloupci 'x'. Umožňuje
+                vytvořit histogram z již sečtených hodnot (např. z
+                Stats.value_counts) bez procházení všech dat."""
         self.n = n
         self.binwidth = binwidth
         self.precision = precision
-        
+        self.weights = None if weights is None else _get_col(data, weights)
+
         AsciiChart.__init__(self, data, x)
 
     @property
@@ -274,14 +381,21 @@ class Histogram(AsciiChart):
         else:
             self._precision = int(value)
 
+    @timed("chart.histogram")
     def _get_chart_data(self):
         # Vrátí data pro graf:
         # hodnoty zdrojového sloupce rozdělené do 'n' tříd,
         # nebo podle (přibližné) šíře 'binwidth'.
-        # Hranice tříd jou zaokrouhleny podle zadané přesnosti."""
+        # Hranice tříd jou zaokrouhleny podle zadané přesnosti.
+        # Prázdný sloupec nemá žádné třídy.
+        if self.col.empty:
+            return pd.Series(dtype=np.int64)
+        low, high = self.col.min(), self.col.max()
         if self.binwidth is not None:
-            data_range = self.col.max() - self.col.min()
+            data_range = high - low
             self.n = (1 if self.binwidth >= data_range
                       else data_range // self.binwidth + 1)
-        return pd.cut(self.col, self.n, precision=self.precision).\
-            value_counts()
+        counter = BinCounter(low, high, self.n)
+        counter.update(self.col.to_numpy(), None if self.weights is None
+                       else self.weights.to_numpy())
+        return counter.to_series(self.precision)
@@ -0,0 +1,92 @@
+"""Benchmark souběžného zápisu statistik z více procesů.
+
+Spustí několik procesů, které zároveň přidávají hry do jednoho souboru
+statistik (každý přes vlastní instanci Stats). Změří propustnost a nakonec
+zkontroluje, že se žádná hra neztratila a id her jsou jedinečná.
+
+    Typické použití:
+
+    python benchmarks/concurrent_writers.py --writers 32 --games 500
+    python benchmarks/concurrent_writers.py --batch-size 50 --cols
+"""
+
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from stats import Stats, StatsCounter, csv_to_columns  # noqa: E402
+
+
+def _writer(task):
+    # Jeden zapisující proces: přidá 'n_games' her, vrátí dobu zápisu.
+    path, n_games, batch_size, barrier = task
+    stats = Stats(path, batch_size=batch_size, keep_df=False)
+    rng = np.random.default_rng()
+    barrier.wait()
+    start = perf_counter()
+    for n_guesses in rng.integers(1, 20, n_games).tolist():
+        game_stats = StatsCounter(stats)
+        game_stats.n_guesses = n_guesses
+        game_stats.time_to_win = n_guesses * 10.0
+        stats.add(game_stats)
+    stats.flush()
+    return perf_counter() - start
+
+
+def run(n_writers, n_games, batch_size, columns=False):
+    """Spustí 'n_writers' procesů zapisujících po 'n_games' hrách.
+
+    Vrací dvojici (počet her za sekundu, zkontrolované statistiky)."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "stats.csv"
+        path.write_text(",".join(Stats.df_columns) + "\n")
+        if columns:
+            csv_to_columns(path, path.with_suffix(".cols"))
+            path = path.with_suffix(".cols")
+
+        with multiprocessing.Manager() as manager:
+            # procesy začnou zapisovat zároveň (bariéra), doba zápisu je
+            # doba nejpomalejšího z nich
+            barrier = manager.Barrier(n_writers)
+            with multiprocessing.Pool(n_writers) as pool:
+                elapsed = max(pool.map(
+                    _writer, [(path, n_games, batch_size, barrier)] *
+                    n_writers))
+
+        stats = Stats(path)
+        game_ids = np.sort(stats["game_id"].to_numpy())
+        expected = n_writers * n_games
+        if not np.array_equal(game_ids, np.arange(1, expected + 1)):
+            raise RuntimeError(f"Expected game ids 1..{expected}, got "
+                               f"{len(game_ids)} games, "
+                               f"{len(np.unique(game_ids))} unique ids!")
+        return expected / elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--games", type=int, default=500,
+                        help="games per writer")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="games written at once by each writer")
+    parser.add_argument("--cols", action="store_true",
+                        help="use the columnar store instead of csv")
+    args = parser.parse_args()
+
+    games_per_s, _ = run(args.writers, args.games, args.batch_size, args.cols)
+    print(f"{args.writers} writers, {args.writers * args.games} games, "
+          f"batch size {args.batch_size}: {games_per_s:.0f} games/s, "
+          f"no games lost, ids unique")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark statistik v databázi SQLite proti csv souboru.
+
+Vygeneruje syntetické statistiky o zadaném počtu řádků, uloží je do csv
+souboru a do databáze SQLite a změří běžné operace obou úložišť: otevření,
+průměr, histogram, nejlepší hry, další id a přidání hry.
+
+    Typické použití:
+
+    python benchmarks/sqlite_vs_csv.py --rows 1000000 10000000
+"""
+
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from sqlite_stats import SqliteStats, csv_to_sqlite  # noqa: E402
+from stats import Stats, StatsCounter  # noqa: E402
+from synthetic import write_synthetic_csv  # noqa: E402
+
+
+def _timed(func):
+    # vrátí dvojici (výsledek, doba běhu v sekundách)
+    start = perf_counter()
+    result = func()
+    return result, perf_counter() - start
+
+
+def _add_game(stats):
+    game_stats = StatsCounter(stats)
+    game_stats.n_guesses = 5
+    game_stats.time_to_win = 12.5
+    stats.add(game_stats)
+
+
+def measure(opener, path):
+    """Změří operace nad statistikami, vrátí slovník {operace: sekundy}."""
+    stats, open_time = _timed(lambda: opener(path))
+    times = {"open": open_time}
+    _, times["mean"] = _timed(lambda: stats.aggregates["n_guesses"].mean)
+    _, times["histogram"] = _timed(lambda: stats.value_counts("time_to_win"))
+    if isinstance(stats, SqliteStats):
+        _, times["top 10"] = _timed(lambda: stats.top("n_guesses", 10))
+    else:
+        _, times["top 10"] = _timed(
+            lambda: stats.df.nsmallest(10, "n_guesses"))
+    _, times["next_id"] = _timed(lambda: stats.next_id)
+    _, times["add"] = _timed(lambda: _add_game(stats))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[10 ** 6, 10 ** 7])
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = Path(tmp_dir) / "stats.csv"
+            sqlite_path = Path(tmp_dir) / "stats.sqlite"
+            write_synthetic_csv(csv_path, n_rows)
+            _, convert_time = _timed(lambda: csv_to_sqlite(csv_path,
+                                                           sqlite_path))
+
+            results = {"csv": measure(Stats, csv_path),
+                       "sqlite": measure(SqliteStats, sqlite_path)}
+            print(f"{n_rows} rows (csv -> sqlite in {convert_time:.1f}s)")
+            print(pd.DataFrame(results).mul(1000).round(2)
+                  .rename_axis("ms").to_string())
+
+
+if __name__ == "__main__":
+    main()
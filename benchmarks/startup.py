@@ -0,0 +1,53 @@
+"""Benchmark doby spuštění hlavního programu.
+
+Opakovaně spustí main.py jako samostatný proces a změří dobu od spuštění
+do vypsání hlavního menu (time-to-first-menu). Poté program ukončí.
+
+    Typické použití:
+
+    python benchmarks/startup.py --runs 20
+"""
+
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+
+MAIN = Path(__file__).parent.parent.absolute() / "main.py"
+MENU_TITLE = "BULLS AND COWS"
+
+
+def time_to_first_menu():
+    """Spustí main.py, vrátí počet sekund do vypsání hlavního menu."""
+    start = perf_counter()
+    process = subprocess.Popen([sys.executable, str(MAIN)],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    elapsed = None
+    for line in process.stdout:
+        if MENU_TITLE in line:
+            elapsed = perf_counter() - start
+            break
+    process.communicate("*\n")
+    if elapsed is None:
+        raise RuntimeError("The main menu was never printed!")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    times = [time_to_first_menu() for _ in range(args.runs)]
+    print(f"time to first menu ({args.runs} runs): "
+          f"min {min(times) * 1000:.1f} ms, "
+          f"median {statistics.median(times) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Sada benchmarků kritických částí programu s porovnáním proti baseline.
+
+Měří validaci a vyhodnocení pokusů, načtení a validaci statistik, přidání
+hry, další id, vykreslení histogramu a stránky tabulky. Statistiky se měří
+nad syntetickými soubory o zadaných počtech řádků (10^3 až 10^8), soubory
+se vygenerují jednou do složky benchmarks/data a dále se používají znovu.
+
+Každé měření se opakuje a bere se nejkratší čas na jednu operaci, spolu
+s ním se ukládá rozptyl měření (o kolik je medián delší než minimum).
+Celá sada se spouští několikrát v samostatných procesech (--runs), výsledek
+je medián běhů a rozptyl zahrnuje i rozdíly mezi běhy, které bývají větší
+než rozdíly uvnitř jednoho procesu.
+Výsledky lze uložit jako baseline (JSON) a pozdější běh s nimi porovnat:
+operace pomalejší o víc než zadaný práh zvětšený o rozptyl obou měření se
+označí jako regrese a program skončí s kódem 1. Časy se při porovnání
+nejdřív vydělí poměrem kalibračního měření (pevná práce nezávislá na kódu
+programu), takže celkové zrychlení nebo zpomalení stroje mezi běhy se za
+regresi nepovažuje.
+
+Benchmarky nad celým dataframe (histogram ze sloupce, stránka tabulky)
+a načtení bez bloků se nad MAX_FULL_LOAD řádků vynechají, statistiky se
+pak drží jen jako průběžné agregáty (keep_df=False).
+
+    Typické použití:
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json --threshold 0.2
+    python benchmarks/suite.py --sizes 1000 100000000 --only stats
+"""
+
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from itertools import cycle
+from pathlib import Path
+from timeit import Timer
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+import game  # noqa: E402
+from ascii_chart import Histogram  # noqa: E402
+from stats import (Stats, StatsCounter, _sidecar_path,  # noqa: E402
+                   _validate_df)
+from synthetic import write_synthetic_csv  # noqa: E402
+from table_view import TableView  # noqa: E402
+
+
+DATA_DIR = Path(__file__).parent / "data"
+# nad tuto velikost se celé statistiky do paměti nenačítají
+MAX_FULL_LOAD = 10 ** 7
+CHUNKSIZE = 10 ** 6
+CALIBRATION = "calibration"
+
+
+def _measure(func, repeat, number=1, scale=1):
+    # Změří funkci 'repeat'krát po 'number' voláních (po jednom zahřívacím
+    # volání). Vrátí {"seconds": nejkratší doba jedné operace násobená
+    # 'scale', "spread": relativní rozdíl mediánu a minima}.
+    func()
+    times = np.array(Timer(func).repeat(repeat, number)) / number
+    best = times.min()
+    return {"seconds": best * scale,
+            "spread": float((np.median(times) - best) / best)}
+
+
+def _synthetic_file(n_rows):
+    # vrátí cestu k syntetickému csv souboru, případně ho vygeneruje
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"stats_{n_rows}.csv"
+    if not path.exists():
+        tmp_path = path.with_suffix(".tmp")
+        write_synthetic_csv(tmp_path, n_rows)
+        tmp_path.replace(path)
+    return path
+
+
+def _remove_sidecars(path):
+    for suffix in (".lock", ".ids", ".sync", ".sync.lock"):
+        _sidecar_path(path, suffix).unlink(missing_ok=True)
+
+
+def _calibration_work():
+    # pevná práce v Pythonu i v numpy, nezávislá na kódu programu
+    sum(i * i for i in range(2000))
+    np.sort(np.arange(20000)[::-1])
+
+
+def bench_calibration(repeat):
+    """Kalibrační měření rychlosti stroje, vrátí {název: výsledek}."""
+    return {CALIBRATION: _measure(_calibration_work, repeat, number=20)}
+
+
+def bench_game(repeat):
+    """Benchmarky validace a vyhodnocení pokusů, vrátí {název: sekundy}."""
+    rng = np.random.default_rng(0)
+    space = game.secret_space()
+    numbers = ["".join(map(str, num))
+               for num in space[rng.integers(0, len(space), 1000)]]
+    invalid = ["0123", "1123", "12a4", "12345"] * 250
+    number = 10 * len(numbers)
+
+    def run_each(func, values):
+        values = cycle(values)
+        return lambda: func(next(values))
+
+    pairs = list(zip(numbers, numbers[1:] + numbers[:1]))
+    engine = game.GameEngine(secret_num="".join(map(str, space[0])))
+    packed = game.pack_digits(space)
+
+    return {
+        "game.validate_guess": _measure(
+            run_each(game._validate_guess, numbers), repeat, number),
+        "game.validate_guess.invalid": _measure(
+            run_each(game._validate_guess, invalid), repeat, number),
+        "game.check_guess": _measure(
+            run_each(lambda pair: game._check_guess(*pair), pairs),
+            repeat, number),
+        "game.engine_guess": _measure(
+            run_each(engine.guess, numbers), repeat, number),
+        # jedna dvojice z vyhodnocení všech dvojic tajných čísel
+        "game.score_packed": _measure(
+            lambda: game.score_packed(packed, packed), repeat,
+            scale=1 / len(packed) ** 2),
+    }
+
+
+def _bench_add(path, repeat):
+    # Latence přidání jedné hry (se zápisem) do souboru se statistikami.
+    # Soubor se potom vrátí do původního stavu.
+    size = path.stat().st_size
+    try:
+        stats = Stats(path, keep_df=False)
+
+        def add():
+            game_stats = StatsCounter(stats)
+            game_stats.n_guesses = 5
+            game_stats.time_to_win = 12.5
+            stats.add(game_stats)
+        return _measure(add, repeat, number=10)
+    finally:
+        with open(path, "r+b") as file:
+            file.truncate(size)
+        _remove_sidecars(path)
+
+
+def bench_stats(n_rows, repeat):
+    """Benchmarky statistik nad souborem s 'n_rows' hrami."""
+    path = _synthetic_file(n_rows)
+    in_memory = n_rows <= MAX_FULL_LOAD
+    results = {}
+    try:
+        if in_memory:
+            results["stats.load"] = _measure(lambda: Stats(path), repeat)
+        results["stats.load_chunked"] = _measure(
+            lambda: Stats(path, chunksize=CHUNKSIZE, keep_df=False), repeat)
+
+        stats = Stats(path, chunksize=CHUNKSIZE, keep_df=in_memory)
+        raw = pd.read_csv(path, nrows=min(n_rows, CHUNKSIZE))
+        results["stats.validate_df"] = _measure(
+            lambda: _validate_df(raw), repeat, scale=n_rows / len(raw))
+        results["stats.next_id"] = _measure(lambda: stats.next_id, repeat,
+                                            number=1000)
+    finally:
+        _remove_sidecars(path)
+    results["stats.add"] = _bench_add(path, repeat)
+
+    def histogram_counts():
+        Histogram(data=stats.value_counts("time_to_win"), x="time_to_win",
+                  weights="count", precision=-1).render()
+
+    results["chart.histogram_counts"] = _measure(histogram_counts, repeat)
+    if in_memory:
+        def histogram_raw():
+            Histogram(data=stats.df, x="time_to_win", precision=-1).render()
+
+        # index sloupce se sestaví při prvním hledání, měří se další
+        # hledání
+        view = TableView({col: stats[col] for col in Stats.df_columns},
+                         headers=Stats.df_columns)
+        view.seek("game_id", 1)
+        game_ids = cycle(np.random.default_rng(0)
+                         .integers(1, n_rows + 1, 1000).tolist())
+
+        def table_page():
+            view.seek("game_id", next(game_ids))
+            view.render()
+
+        results["chart.histogram_raw"] = _measure(histogram_raw, repeat)
+        results["table.seek_render"] = _measure(table_page, repeat,
+                                                number=10)
+    return {f"{name}[{n_rows}]": result
+            for name, result in results.items()}
+
+
+def run(sizes, repeat, only=None):
+    """Spustí benchmarky, vrátí slovník {"meta": {...}, "results": {...}}.
+
+    Výsledek benchmarku je slovník {"seconds": doba jedné operace,
+    "spread": relativní rozptyl měření}.
+
+    Argumenty:
+        sizes: počty řádků syntetických statistik
+        repeat: počet opakování každého měření
+        only: spustit jen skupinu "game" nebo "stats" (None = obě)
+    """
+    results = bench_calibration(repeat)
+    if only in (None, "game"):
+        results.update(bench_game(repeat))
+    if only in (None, "stats"):
+        for n_rows in sizes:
+            results.update(bench_stats(n_rows, repeat))
+    meta = {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat}
+    return {"meta": meta, "results": results}
+
+
+def run_processes(sizes, repeat, only=None, runs=3):
+    """Spustí sadu 'runs'krát, každý běh v samostatném procesu.
+
+    Vrací slovník jako run: čas je medián časů běhů, rozptyl je větší
+    z rozptylu uvnitř běhů a relativního rozdílu nejpomalejšího
+    a nejrychlejšího běhu."""
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(runs):
+            path = Path(tmp_dir) / f"run_{i}.json"
+            command = [sys.executable, __file__, "--runs", "1",
+                       "--repeat", str(repeat), "--save", str(path),
+                       "--sizes", *map(str, sizes)]
+            if only is not None:
+                command += ["--only", only]
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(path) as file:
+                reports.append(json.load(file))
+
+    results = {}
+    for name in reports[0]["results"]:
+        seconds = np.array([report["results"][name]["seconds"]
+                            for report in reports])
+        spread = max(report["results"][name]["spread"]
+                     for report in reports)
+        results[name] = {
+            "seconds": float(np.median(seconds)),
+            "spread": max(spread, float(seconds.max() / seconds.min() - 1))}
+    meta = dict(reports[0]["meta"], runs=runs)
+    return {"meta": meta, "results": results}
+
+
+def compare(results, baseline, threshold):
+    """Porovná výsledky s baseline.
+
+    Vrací dataframe s časy, poměrem k baseline a sloupcem 'regression'.
+    Regrese je čas delší o víc než 'threshold' (např. 0.2 = o 20 %)
+    zvětšený o rozptyl měření baseline i aktuálního běhu, takže zašuměná
+    měření se za regrese neoznačí. Poměr je vydělený poměrem kalibračního
+    měření (rychlost stroje)."""
+    table = pd.DataFrame({
+        "baseline": pd.Series({name: result["seconds"]
+                               for name, result in baseline.items()},
+                              dtype=float),
+        "current": pd.Series({name: result["seconds"]
+                              for name, result in results.items()},
+                             dtype=float),
+        "spread": pd.Series({name: result["spread"]
+                             for name, result in baseline.items()},
+                            dtype=float).add(
+            pd.Series({name: result["spread"]
+                       for name, result in results.items()}, dtype=float),
+            fill_value=0)})
+    table["ratio"] = table["current"] / table["baseline"]
+    if CALIBRATION in table.index:
+        table["ratio"] /= table.loc[CALIBRATION, "ratio"]
+    table["regression"] = table["ratio"] > 1 + threshold + table["spread"]
+    return table
+
+
+def _format_seconds(seconds):
+    if np.isnan(seconds):
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6],
+                        help="rows of the synthetic stats files")
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3,
+                        help="runs of the whole suite in separate processes")
+    parser.add_argument("--only", choices=["game", "stats"])
+    parser.add_argument("--save", metavar="FILE",
+                        help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results with a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown reported as a regression on top "
+                             "of the measurement spread (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    if args.runs > 1:
+        report = run_processes(args.sizes, args.repeat, args.only, args.runs)
+    else:
+        report = run(args.sizes, args.repeat, args.only)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare is None:
+        for name, result in report["results"].items():
+            print(f"{name:<40} {_format_seconds(result['seconds']):>12} "
+                  f"±{result['spread']:.0%}")
+        return
+
+    with open(args.compare) as file:
+        baseline = json.load(file)["results"]
+    table = compare(report["results"], baseline, args.threshold)
+    for name, row in table.iterrows():
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{name:<40} {_format_seconds(row['baseline']):>12} "
+              f"{_format_seconds(row['current']):>12} "
+              f"{row['ratio']:>6.2f}x "
+              f"(limit {1 + args.threshold + row['spread']:.2f}x) {flag}")
+    n_regressions = int(table["regression"].sum())
+    print(f"{n_regressions} regression(s), threshold {args.threshold:.0%}")
+    if n_regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
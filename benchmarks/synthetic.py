@@ -0,0 +1,26 @@
+"""Syntetické statistiky her pro benchmarky.
+
+Soubory se generují po blocích, takže lze vytvořit i statistiky se stovkami
+milionů řádků bez jejich držení v paměti. Obsah závisí jen na počtu řádků
+a seedu.
+"""
+
+
+import numpy as np
+import pandas as pd
+
+
+def write_synthetic_csv(path, n_rows, seed=0, chunk_size=10 ** 6):
+    """Zapíše csv soubor s 'n_rows' náhodnými hrami."""
+    with open(path, "w", newline="") as file:
+        file.write("game_id,n_guesses,time_to_win\n")
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_size)):
+            n_chunk = min(chunk_size, n_rows - start)
+            rng = np.random.default_rng([seed, chunk_index])
+            n_guesses = rng.integers(1, 30, n_chunk)
+            pd.DataFrame({
+                "game_id": np.arange(start + 1, start + n_chunk + 1),
+                "n_guesses": n_guesses,
+                "time_to_win": np.round(
+                    n_guesses * rng.uniform(3, 15, n_chunk), 2),
+            }).to_csv(file, index=False, header=False)
@@ -1,6 +1,7 @@
 """Modul pro hru Bulls and Cows.
 
-Vyžaduje modul 'stats'. Obsahuje jedinou třídu BullsAndCows.
+Vyžaduje modul 'stats'. Třída GameEngine je samotná hra bez vstupu
+a výstupu, třída BullsAndCows je její terminálové rozhraní.
 Samostatně spustitelný (pouze bez použítí globálních statistik).
 
     Typické použití:
@@ -11,26 +12,299 @@ Samostatně spustitelný (pouze bez použítí globálních statistik).
     # zápis do globáních statistik
     if game.won:
         global_stats.add(game.game_stats)
+
+    # hra bez vstupu a výstupu
+    engine = GameEngine()
+    verdict = engine.guess("1234")  # Verdict(bulls=.., cows=..)
+
+    # hromadné vyhodnocení (např. pro simulace a řešiče)
+    bulls, cows = score_guesses(to_digit_array(["1234", "5678"]),
+                                to_digit_array(["1243"]))
+
+    # reprodukovatelná tajná čísla, nezávislý proud pro každý proces
+    secrets = generate_secrets(1000, secret_rng(seed=42, stream=worker))
+    engine = GameEngine(secrets[0])
+
+Čísla se interně kódují do jednoho celého čísla (pack_number): cifry po
+4 bitech (nibblech) v dolních 16 bitech a nad nimi 10bitová maska
+přítomných cifer. Bulls je počet nulových nibblů XORu dvou čísel, společné
+cifry jsou počet jedniček v průniku masek, cows je jejich rozdíl. Oba
+počty se čtou z předpočítaných tabulek. Stejné kódování používá validace,
+herní logika i hromadné vyhodnocení (score_packed) pro tabulku odpovědí
+řešitele.
 """
 
 
-from random import sample
+import os
+from collections import namedtuple
+from functools import lru_cache
+from itertools import permutations
+
+import numpy as np
 
+from instrumentation import count, timed
 from stats import Stats, StatsCounter
 
 
-class Error:
-    def __init__(self, condition, message):
-        self.condition = condition
-        self.message = message
+Verdict = namedtuple("Verdict", ["bulls", "cows"])
+
+# kódování čísla: cifry v dolních 16 bitech, maska cifer od 16. bitu
+_MASK_SHIFT = 16
+_DIGITS = (1 << _MASK_SHIFT) - 1
+_SHIFTS = (12, 8, 4, 0)
+
+# počet nulových nibblů 16bitového čísla a počet jedniček 10bitové masky
+_ZERO_NIBBLES = sum(((np.arange(1 << 16) >> shift) & 0xF) == 0
+                    for shift in _SHIFTS).astype(np.uint8)
+_POPCOUNT = sum((np.arange(1 << 10) >> bit) & 1
+                for bit in range(10)).astype(np.uint8)
+# totéž jako bytes, indexování vrací int (rychlejší pro jednotlivá čísla)
+_ZERO_NIBBLES_BYTES = _ZERO_NIBBLES.tobytes()
+_POPCOUNT_BYTES = _POPCOUNT.tobytes()
+
+
+class InvalidGuessError(ValueError):
+    """Neplatný pokus. Atribut 'messages' je tuple všech nalezených chyb."""
+    def __init__(self, messages):
+        super().__init__(" ".join(messages))
+        self.messages = messages
+
+
+def pack_number(number):
+    """Zakóduje čtyřciferné číslo (string nebo list cifer) do integeru.
+
+    Cifry jsou po 4 bitech, první cifra v nejvyšších, nad nimi je maska
+    přítomných cifer (bit 'd' pro cifru 'd')."""
+    digits = mask = 0
+    for char in number:
+        digit = ord(char) - 48
+        digits = digits << 4 | digit
+        mask |= 1 << digit
+    return digits | mask << _MASK_SHIFT
+
+
+def unpack_number(packed):
+    """Vrátí číslo (string) zakódované funkcí pack_number."""
+    return "".join(str(packed >> shift & 0xF) for shift in _SHIFTS)
+
+
+def _pack_valid(guess):
+    # Zakóduje hádané číslo, pokud je validní, jinak vrátí None (chyby
+    # vypíše _validate_guess). Cifry jsou jedinečné, pokud má maska
+    # 4 jedničky.
+    if (len(guess) != 4 or not (guess.isdecimal() and guess.isascii())
+            or guess[0] == "0"):
+        return None
+    packed = pack_number(guess)
+    if _POPCOUNT_BYTES[packed >> _MASK_SHIFT] != 4:
+        return None
+    return packed
+
+
+# měřená varianta pro GameEngine.guess, _validate_guess volá neměřenou,
+# aby se nevalidní pokus nezapočítal dvakrát
+_pack_guess = timed("game.validate_guess")(_pack_valid)
+
+
+def _validate_guess(guess):
+    # Zkontroluje validitu hádaného čísla, vrátí tuple chybových hlášek.
+    # Pro validní číslo vrací prázdný tuple bez dalších alokací.
+    if _pack_valid(guess) is not None:
+        return ()
+
+    errors = []
+    if not (guess.isdecimal() and guess.isascii()):
+        errors.append("Guess must be a number!")
+    if len(guess) != 4:
+        errors.append("Guessed number must be 4 digits long!")
+    if guess[:1] == "0":
+        errors.append("Guessed number must not start with a 0!")
+    if len(guess) != len(set(guess)):
+        errors.append("Each digit must be unique!")
+    return tuple(errors)
+
+
+@timed("game.check_guess")
+def _check_packed(guess, secret_num):
+    # Vyhodnotí zakódované hádané číslo, vrátí Verdict s počtem 'Bulls'
+    # a 'Cows'
+    bulls = _ZERO_NIBBLES_BYTES[(guess ^ secret_num) & _DIGITS]
+    common = _POPCOUNT_BYTES[(guess & secret_num) >> _MASK_SHIFT]
+    return Verdict(bulls, common - bulls)
+
+
+def _check_guess(guess, secret_num):
+    # Vyhodnotí hádané číslo, vrátí Verdict s počtem 'Bulls' a 'Cows'
+    return _check_packed(pack_number(guess), pack_number(secret_num))
+
+
+def to_digit_array(numbers):
+    """Převede čísla zadaná jako stringy na pole cifer tvaru (N, 4)."""
+    return np.array([[int(digit) for digit in num] for num in numbers],
+                    dtype=np.int8).reshape(-1, 4)
+
+
+def pack_digits(digits):
+    """Zakóduje pole cifer tvaru (N, 4) jako pack_number, vrátí pole uint32."""
+    digits = np.asarray(digits).astype(np.uint32)
+    packed = np.zeros(len(digits), dtype=np.uint32)
+    for position, shift in enumerate(_SHIFTS):
+        packed |= digits[:, position] << shift
+        packed |= np.uint32(1 << _MASK_SHIFT) << digits[:, position]
+    return packed
+
+
+def score_packed(guesses, secrets):
+    """Vyhodnotí najednou všechny dvojice zakódovaných čísel.
+
+    Počítá stejně jako _check_packed, ale pro N hádaných a M tajných čísel
+    (pole z pack_digits) jediným vektorovým výpočtem nad tabulkami.
+
+    Vrací:
+        dvojici matic (bulls, cows) typu uint8 tvaru (N, M)
+    """
+    guesses, secrets = np.asarray(guesses), np.asarray(secrets)
+    bulls = _ZERO_NIBBLES.take(np.bitwise_xor.outer(
+        (guesses & _DIGITS).astype(np.uint16),
+        (secrets & _DIGITS).astype(np.uint16)))
+    cows = _POPCOUNT.take(np.bitwise_and.outer(
+        (guesses >> _MASK_SHIFT).astype(np.uint16),
+        (secrets >> _MASK_SHIFT).astype(np.uint16)))
+    cows -= bulls
+    return bulls, cows
+
+
+def score_guesses(guesses, secrets):
+    """Vyhodnotí najednou všechny dvojice hádaných a tajných čísel.
+
+    Argumenty:
+        guesses: pole celých čísel tvaru (N, 4), cifry hádaných čísel
+        secrets: pole celých čísel tvaru (M, 4), cifry tajných čísel
+
+    Vrací:
+        dvojici matic (bulls, cows) typu uint8 tvaru (N, M), viz score_packed
+    """
+    return score_packed(pack_digits(guesses), pack_digits(secrets))
+
+
+@lru_cache(maxsize=None)
+def secret_space():
+    """Vrátí všechna platná tajná čísla jako pole cifer tvaru (4536, 4).
+
+    Čísla jsou seřazená vzestupně, pořadí řádku je tedy zároveň indexem
+    čísla v tabulce odpovědí (modul 'score_table'). Pole je jen pro čtení."""
+    space = np.array([num for num in permutations(range(10), 4)
+                      if num[0] != 0], dtype=np.int8)
+    space.flags.writeable = False
+    return space
 
 
-def _generate_secret_num():
-    # Vytvoří čtyřciferné tajné číslo, kde se žádná cifra neopakuje
-    while True:
-        num = [str(item) for item in sample(range(0, 10), 4)]
-        if num[0] != "0":
-            return num
+@lru_cache(maxsize=None)
+def _secret_strings():
+    # všechna platná tajná čísla jako pole stringů (ve stejném pořadí jako
+    # secret_space)
+    return np.array(["".join(map(str, num)) for num in secret_space()])
+
+
+def secret_rng(seed=None, stream=0):
+    """Vrátí generátor náhodných čísel (numpy Generator) pro tajná čísla.
+
+    Generátory se stejným 'seed' a různým 'stream' jsou nezávislé (stejně
+    jako generátory z SeedSequence(seed).spawn), každý proces nebo blok
+    práce tak může mít vlastní reprodukovatelný proud čísel. Bez 'seed'
+    je generátor náhodný."""
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(stream,)))
+
+
+# výchozí generátor procesu (viz _default_secret_rng) a id procesu,
+# ve kterém vznikl
+_default_rng = None
+_default_rng_pid = None
+
+
+def _default_secret_rng():
+    # Výchozí generátor tajných čísel: jeden proud z jediné SeedSequence
+    # (entropie OS) na proces, vytvoří se při prvním použití. Po forku se
+    # vytvoří znovu, aby procesy nelosovaly stejná čísla.
+    global _default_rng, _default_rng_pid
+    if _default_rng is None or _default_rng_pid != os.getpid():
+        _default_rng = secret_rng()
+        _default_rng_pid = os.getpid()
+    return _default_rng
+
+
+def generate_secret_indices(n, rng=None):
+    """Vylosuje 'n' tajných čísel jako indexy do secret_space (pole int64).
+
+    Každé platné číslo má stejnou pravděpodobnost, indexy jsou zároveň
+    indexy čísel v tabulce odpovědí (modul 'score_table')."""
+    rng = _default_secret_rng() if rng is None else rng
+    return rng.integers(len(secret_space()), size=n)
+
+
+def generate_secrets(n, rng=None):
+    """Vylosuje najednou 'n' tajných čísel, vrátí list stringů.
+
+    Argumenty:
+        n: počet čísel
+        rng:
+            numpy Generator (např. ze secret_rng), None = výchozí náhodný
+            generátor procesu
+    """
+    return _secret_strings()[generate_secret_indices(n, rng)].tolist()
+
+
+class GameEngine:
+    """Hra Bulls and Cows bez vstupu a výstupu.
+
+    Veškerý stav hry je v atributech, jednotlivé pokusy se vyhodnocují
+    metodou guess. Vhodné pro programové hraní (simulace, server).
+
+    Atributy:
+        secret_num: string, tajné číslo
+        n_guesses: počet validních pokusů
+        won: bool, jestli bylo číslo uhodnuto
+    """
+    __slots__ = ("secret_num", "n_guesses", "won", "_secret")
+
+    def __init__(self, secret_num=None, rng=None):
+        """Argumenty:
+            secret_num:
+                Tajné číslo (string nebo list cifer). Pokud není zadáno,
+                vygeneruje se náhodně.
+            rng:
+                Generátor pro náhodné tajné číslo (numpy Generator, viz
+                secret_rng), umožňuje hru zopakovat. Volající ho má
+                vytvořit jednou a předávat všem hrám, bez něj se použije
+                výchozí generátor procesu."""
+        if secret_num is None:
+            secret_num = generate_secrets(1, rng)[0]
+        self.secret_num = "".join(secret_num)
+        self._secret = pack_number(self.secret_num)
+        self.n_guesses = 0
+        self.won = False
+
+    def guess(self, guess):
+        """Vyhodnotí pokus a vrátí Verdict(bulls, cows).
+
+        Vyvolává:
+            InvalidGuessError: pokus není validní, nezapočítá se.
+            RuntimeError: hra už byla vyhraná.
+        """
+        if self.won:
+            raise RuntimeError("The game is already won!")
+
+        packed = _pack_guess(guess)
+        if packed is None:
+            count("game.invalid_guesses")
+            raise InvalidGuessError(_validate_guess(guess))
+
+        self.n_guesses += 1
+        verdict = _check_packed(packed, self._secret)
+        if verdict.bulls == 4:
+            self.won = True
+        return verdict
 
 
 class BullsAndCows:
@@ -45,25 +319,37 @@ class BullsAndCows:
     jsou vypsány po dohrání a pokud je k dispozici soubor se
     statistikami minulých her i globální průmery.
 
+    Terminálové rozhraní nad instancí třídy GameEngine.
+
     Atributy:
         global_stats: instance třídy Stats se statistikami minulých her
         game_stats:
             instance třídy StatsCounter pro zaznamenávání herních statistik
+        engine:
+            instance třídy GameEngine, samotná hra (nebo jiný engine se
+            stejným rozhraním, např. variants.VariantEngine)
+        transcript:
+            instance třídy transcript.TranscriptWriter, do které se
+            zaznamenávají pokusy hry (nebo None). Zaznamenává se jen
+            standardní hra (GameEngine).
         secret_num: list, náhodně vygenerované tajné číslo
         won: bool, jestli byla hra úspěšně dohrána
     """
-    def __init__(self, global_stats=None):
+    __slots__ = ("_global_stats", "game_stats", "engine", "transcript", "won",
+                 "_abort_key")
+
+    def __init__(self, global_stats=None, engine=None, transcript=None):
         self.global_stats = global_stats
 
         self.game_stats = StatsCounter(self.global_stats)
-        self.secret_num = _generate_secret_num()
+        self.engine = GameEngine() if engine is None else engine
+        if not isinstance(self.engine, GameEngine):
+            transcript = None
+        self.transcript = transcript
         self.won = False
 
         # interní atributy
-        self._guess = None
-        self._found_errors = []
         self._abort_key = "*"
-        self._bc_counter = dict(bull=0, cow=0)
 
     @property
     def global_stats(self):
@@ -77,97 +363,82 @@ class BullsAndCows:
         else:
             self._global_stats = obj
 
-    def _validate_guess(self):
-        # Zkontroluje validitu hádaného čísla, zaznamená chyby
-        errors = [Error(not self._guess.isnumeric(),
-                        "Guess must be a number!"),
-                  Error(len(self._guess) != 4,
-                        "Guessed number must be 4 digits long!"),
-                  Error(self._guess[0] == '0',
-                        "Guessed number must not start with a 0!"),
-                  Error(len(self._guess) != len(set(self._guess)),
-                        "Each digit must be unique!")]
-
-        self._found_errors = []
-
-        for error in errors:
-            if error.condition is True:
-                self._found_errors.append(error)
-
-    def _check_guess(self):
-        # Vyhodnotí hádané číslo a počet 'Bulls' a 'Cows' zapíše do počítadla
-        self._bc_counter = dict(bull=0, cow=0)
-
-        for i, digit in enumerate(self._guess):
-            if digit in self.secret_num:
-                if digit == self.secret_num[i]:
-                    self._bc_counter["bull"] += 1
-                else:
-                    self._bc_counter["cow"] += 1
-
-    def _print_verdict(self):
-        # Projde počítadlo, vytvoří verdikt se správnými množnými čísly,
-        # vypíše ho.
-        verdict = ""
-        for key, val in self._bc_counter.items():
-            verdict += f"| {val} {key} " if val == 1 else f"| {val} {key}s "
-        print(verdict)
+    @property
+    def secret_num(self):
+        """List, tajné číslo."""
+        return list(self.engine.secret_num)
+
+    @staticmethod
+    def _print_verdict(verdict):
+        # Vytvoří verdikt se správnými množnými čísly, vypíše ho.
+        print("".join(f"| {val} {key} " if val == 1 else f"| {val} {key}s "
+                      for key, val in (("bull", verdict.bulls),
+                                       ("cow", verdict.cows))))
+
+    def _global_mean(self, col):
+        # průměr sloupce globálních statistik z průběžných agregátů
+        return self.global_stats.aggregates[col].mean
 
     def _victory_message(self, digits=2):
         # Pogratuluje hráči k vítězství a vypíše statistiky dohrané hry
         # a srovnání s globálními průměry (pokud jsou k dispozici).
         str_guesses = f"Guesses: {self.game_stats['n_guesses']}"
         str_mean_guesses = "" if self.global_stats is None else (
-            f" (average: "
-            f"{self.global_stats['n_guesses'].mean().round(digits)})")
+            f" (average: {round(self._global_mean('n_guesses'), digits)})")
 
         str_time = f"Game time: {self.game_stats['time_to_win']}s "
         str_mean_time = "" if self.global_stats is None else (
-            f" (average: "
-            f"{self.global_stats['time_to_win'].mean().round(digits)}s)")
+            f" (average: {round(self._global_mean('time_to_win'), digits)}s)")
 
         print(f"Success!")
         print(str_guesses + str_mean_guesses)
         print(str_time + str_mean_time)
 
+    def _flush_transcript(self):
+        # zapíše záznam dohrané nebo přerušené hry do souboru
+        if self.transcript is not None:
+            self.transcript.flush()
+
     def play(self):
         """Spustí hru Bulls and Cows
 
         Po skončení jsou v atributu 'game_stats' uloženy herní statistiky a
         v atributu 'won' jestli byla hra úspěšně dohraná."""
         self.game_stats.start_timer()
+        if self.transcript is not None:
+            self.transcript.start_game(self.engine.secret_num)
 
         print(f"Enter your guess ('{self._abort_key}' to quit):")
         print(20 * "-")
         while True:
-            self._guess = input(">>> ")
+            guess = input(">>> ")
 
-            if self._guess == self._abort_key:
+            if guess == self._abort_key:
                 # pokud je zadán kód pro přerušení, přeruš hru
                 print("-game aborted-")
-                print(f"The number was {''.join(self.secret_num)}")
+                print(f"The number was {self.engine.secret_num}")
                 self.won = False
+                self._flush_transcript()
                 return
-            else:
-                # jinak zkontroluj validitu
-                self._validate_guess()
-                if self._found_errors:
-                    # pokud jsou nalezeny chyby, vypiš je a pokračuj na další
-                    # iteraci
-                    print("\n".join(
-                        [err.message for err in self._found_errors]))
-                    continue
-                else:
-                    # jinak připočítej hádání
-                    self.game_stats.count_guess()
-
-            self._check_guess()
-            self._print_verdict()
-
-            if self._bc_counter["bull"] == 4:
+
+            try:
+                verdict = self.engine.guess(guess)
+            except InvalidGuessError as e:
+                # pokud jsou nalezeny chyby, vypiš je a pokračuj na další
+                # iteraci
+                print("\n".join(e.messages))
+                continue
+
+            self.game_stats.count_guess()
+            if self.transcript is not None:
+                self.transcript.record(guess, verdict)
+            self._print_verdict(verdict)
+
+            if self.engine.won:
                 self.game_stats.mark_time()
                 self._victory_message()
                 self.won = True
+                self._flush_transcript()
                 return
 
 
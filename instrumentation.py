@@ -0,0 +1,195 @@
+"""Modul pro měření doby běhu a počtu volání kritických částí programu.
+
+Měření se zapíná proměnnou prostředí BULLS_COWS_METRICS (před spuštěním
+programu). Hodnota "1" měření zapne, cesta k souboru s příponou '.json'
+nebo '.prom' ho zapne a při ukončení programu do souboru zapíše výsledky
+(JSON nebo textový formát Prometheus). Bez proměnné vrací dekorátor timed
+původní funkci beze změny, takže vypnuté měření nic nestojí.
+
+Časovače jsou pojmenované, měří se pomocí perf_counter_ns a uchovávají
+počet volání, celkový, nejkratší a nejdelší čas. Počítadla jsou pojmenované
+celočíselné součty.
+
+    Typické použití:
+
+    @timed("game.check_guess")  # měření funkce
+    def _check_guess(guess, secret_num):
+        ...
+
+    with timer("stats.load"):  # měření bloku kódu
+        ...
+
+    count("stats.rows_loaded", len(df))  # započtení do počítadla
+    print(report())  # tabulka výsledků
+    export("metrics.prom")  # zápis do souboru
+"""
+
+
+import atexit
+import os
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter_ns
+
+
+ENV_VAR = "BULLS_COWS_METRICS"
+
+_setting = os.environ.get(ENV_VAR, "")
+enabled = _setting not in ("", "0")
+# soubor, do kterého se výsledky zapíší při ukončení programu (nebo None)
+export_path = _setting if _setting.endswith((".json", ".prom")) else None
+
+_timers = {}
+_counters = {}
+_null_timer = nullcontext()
+
+
+class _Timer:
+    # souhrnné výsledky jednoho časovače (časy v nanosekundách)
+    __slots__ = ("calls", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, elapsed_ns):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if self.min_ns is None or elapsed_ns < self.min_ns:
+            self.min_ns = elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+
+class _TimerContext:
+    # kontextový manažer měřící dobu běhu bloku kódu
+    __slots__ = ("_timer", "_start")
+
+    def __init__(self, timer_):
+        self._timer = timer_
+
+    def __enter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._timer.record(perf_counter_ns() - self._start)
+
+
+def _get_timer(name):
+    if name not in _timers:
+        _timers[name] = _Timer()
+    return _timers[name]
+
+
+def timed(name):
+    """Dekorátor, který měří dobu běhu funkce časovačem 'name'.
+
+    Pokud je měření vypnuté, vrací funkci beze změny."""
+    def decorator(func):
+        if not enabled:
+            return func
+        timer_ = _get_timer(name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer_.record(perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+
+def timer(name):
+    """Vrátí kontextový manažer, který měří blok kódu časovačem 'name'."""
+    if not enabled:
+        return _null_timer
+    return _TimerContext(_get_timer(name))
+
+
+def count(name, n=1):
+    """Přičte 'n' k počítadlu 'name'."""
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def reset():
+    """Vynuluje všechny časovače a počítadla."""
+    for timer_ in _timers.values():
+        timer_.reset()
+    _counters.clear()
+
+
+def snapshot():
+    """Vrátí výsledky jako slovník {"timers": {...}, "counters": {...}}."""
+    return {"timers": {name: {"calls": timer_.calls,
+                              "total_ns": timer_.total_ns,
+                              "min_ns": timer_.min_ns,
+                              "max_ns": timer_.max_ns}
+                       for name, timer_ in sorted(_timers.items())
+                       if timer_.calls},
+            "counters": dict(sorted(_counters.items()))}
+
+
+def to_prometheus():
+    """Vrátí výsledky v textovém formátu Prometheus."""
+    data = snapshot()
+    lines = []
+    metrics = (("calls_total", "counter", lambda t: t["calls"]),
+               ("seconds_total", "counter", lambda t: t["total_ns"] / 1e9),
+               ("max_seconds", "gauge", lambda t: t["max_ns"] / 1e9))
+    for suffix, metric_type, value in metrics:
+        metric = f"bulls_cows_timer_{suffix}"
+        lines.append(f"# TYPE {metric} {metric_type}")
+        lines.extend(f'{metric}{{name="{name}"}} {value(timer_)}'
+                     for name, timer_ in data["timers"].items())
+    lines.append("# TYPE bulls_cows_counter_total counter")
+    lines.extend(f'bulls_cows_counter_total{{name="{name}"}} {value}'
+                 for name, value in data["counters"].items())
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    """Zapíše výsledky do souboru, formát podle přípony ('.json' nebo
+    '.prom')."""
+    if str(path).endswith(".json"):
+        import json
+
+        text = json.dumps(snapshot(), indent=2)
+    else:
+        text = to_prometheus()
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def report():
+    """Vrátí výsledky jako textovou tabulku."""
+    data = snapshot()
+    if not data["timers"] and not data["counters"]:
+        return "No measurements yet."
+
+    width = max(map(len, (*data["timers"], *data["counters"], "TIMER")))
+    lines = [f"{'TIMER':<{width}} {'CALLS':>10} {'TOTAL ms':>10} "
+             f"{'MEAN us':>10} {'MAX us':>10}"]
+    for name, timer_ in data["timers"].items():
+        lines.append(f"{name:<{width}} {timer_['calls']:>10} "
+                     f"{timer_['total_ns'] / 1e6:>10.2f} "
+                     f"{timer_['total_ns'] / timer_['calls'] / 1e3:>10.2f} "
+                     f"{timer_['max_ns'] / 1e3:>10.2f}")
+    if data["counters"]:
+        lines.append("")
+        lines.append(f"{'COUNTER':<{width}} {'VALUE':>10}")
+        lines.extend(f"{name:<{width}} {value:>10}"
+                     for name, value in data["counters"].items())
+    return "\n".join(lines)
+
+
+if export_path is not None:
+    atexit.register(export, export_path)
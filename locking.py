@@ -0,0 +1,92 @@
+"""Modul s meziprocesovým zámkem nad souborem.
+
+Zámek je poradní (advisory): chrání jen proti procesům, které ho také
+používají. Na POSIX systémech se zamyká pomocí fcntl.flock, na Windows
+pomocí msvcrt.locking. Zámek je reentrantní v rámci jednoho vlákna, takže
+metoda držící zámek může volat jinou metodu, která ho také bere. Jiné
+vlákno téže instance na zámek čeká (vlákna se řadí přes threading.RLock).
+
+    Typické použití:
+
+    lock = FileLock(path.with_name(path.name + ".lock"))
+    with lock:
+        ...  # zápis, který nesmí proběhnout souběžně s jiným procesem
+"""
+
+
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Výhradní zámek nad souborem sdílený mezi procesy.
+
+    Atributy:
+        path: cesta k souboru zámku (vytvoří se, pokud neexistuje)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+        # vlákno, které zámek drží (počítadlo _depth patří jen jemu)
+        self._owner = None
+        self._thread_lock = threading.RLock()
+
+    def acquire(self):
+        """Počká na zámek a zamkne ho."""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            file = open(self.path, "a+b")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                else:
+                    file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            # LK_LOCK to vzdá po 10 s, čekej dál
+                            continue
+            except BaseException:
+                file.close()
+                self._thread_lock.release()
+                raise
+            self._file = file
+            self._owner = threading.get_ident()
+        self._depth += 1
+
+    def release(self):
+        """Odemkne zámek."""
+        if self._depth == 0 or self._owner != threading.get_ident():
+            raise RuntimeError("The lock is not held!")
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+            self._owner = None
+        self._thread_lock.release()
+
+    @property
+    def locked(self):
+        """Bool, jestli zámek drží tato instance (v aktuálním vlákně)."""
+        return self._depth > 0 and self._owner == threading.get_ident()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
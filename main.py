@@ -1,48 +1,117 @@
 import sys
 
-from tabulate import tabulate
-
 from menu_system import Main, Menu, clear
-from stats import Stats
-from ascii_chart import Histogram
-from game import BullsAndCows
 
+# Globální statistiky. Načítají se až při prvním použití (get_global_stats),
+# aby se těžké knihovny (pandas, numpy) importovaly až ve chvíli,
+# kdy jsou potřeba, a ne před vypsáním menu.
+global_stats = None
 
-def n_guesses_chart():
-    # vytvoří a vypíše graf počtu hádání
-    if not global_stats.valid:
+# vykreslené grafy podle (verze statistik, parametry grafu), viz _show_chart
+_chart_cache = {}
+
+
+def get_global_stats():
+    # Při prvním zavolání načte globální statistiky a vypíše chyby načítání,
+    # při dalších načte hry, které mezitím zapsaly jiné procesy.
+    global global_stats
+    if global_stats is None:
+        from stats import Stats
+
+        global_stats = Stats("global_game_stats.csv")
+        if global_stats.errors:
+            print("\n".join(global_stats.errors))
+    elif global_stats.valid:
+        global_stats.refresh()
+    return global_stats
+
+
+def _show_chart(x, labels, precision):
+    # Vypíše histogram sloupce 'x'. Vykreslený graf se ukládá do cache podle
+    # verze statistik a parametrů grafu, takže opakované zobrazení je
+    # okamžité. Po přidání hry (nová verze) se cache vyprázdní.
+    from ascii_chart import Histogram
+
+    if not get_global_stats().valid:
         print("Global Statistics unavailable!")
         return
+    if global_stats.empty:
+        print("No games played yet!")
+        return
+
+    key = (global_stats.version, x, tuple(labels), precision)
+    if key not in _chart_cache:
+        if any(cached[0] != global_stats.version for cached in _chart_cache):
+            _chart_cache.clear()
 
-    chart = Histogram(data=global_stats.df, x="n_guesses", precision=0)
-    chart.sort_data(sort_by="index")
-    chart.format(labels=["GUESSES", "GAMES"])
-    chart.show()
+        chart = Histogram(data=global_stats.value_counts(x), x=x,
+                          weights="count", precision=precision)
+        chart.sort_data(sort_by="index")
+        chart.format(labels=labels)
+        _chart_cache[key] = chart.render()
+
+    print(_chart_cache[key])
     input("...")
 
 
+def n_guesses_chart():
+    # vytvoří a vypíše graf počtu hádání
+    _show_chart("n_guesses", ["GUESSES", "GAMES"], precision=0)
+
+
 def time_to_win_chart():
     # vytvoří a vypíše graf časů dohrání
-    if not global_stats.valid:
-        print("Global Statistics unavailable!")
-        return
+    _show_chart("time_to_win", ["TIME TO WIN(s)", "GAMES"], precision=-1)
 
-    chart = Histogram(data=global_stats.df, x="time_to_win", precision=-1)
-    chart.sort_data(sort_by="index")
-    chart.format(labels=["TIME TO WIN(s)", "GAMES"])
-    chart.show()
-    input("...")
 
+def raw_data(page_size=20):
+    # Vypíše tabulku se surovými daty po stránkách. Vykresluje se jen
+    # viditelná stránka, takže první stránka je k dispozici okamžitě.
+    from table_view import TableView
 
-def raw_data():
-    # vypíše tabulku se surovými daty
-    if not global_stats.valid:
+    if not get_global_stats().valid:
         print("Global Statistics unavailable!")
         return
 
-    print(tabulate(global_stats.df, showindex=False, tablefmt="psql",
-                   headers=("Game \nnumber", "Number of \nGuesses",
-                            "Time to \nwin")))
+    columns = {col: global_stats[col] for col in global_stats.df_columns}
+    view = TableView(columns,
+                     headers=("Game \nnumber", "Number of \nGuesses",
+                              "Time to \nwin"),
+                     page_size=page_size)
+    while True:
+        print(view.render())
+        print("(Enter) Next page (p) Previous page (g <number>) Go to game "
+              "(*) Back")
+        command = input(">>> ").strip()
+
+        if command == "*":
+            return
+        elif command == "p":
+            view.previous_page()
+        elif command[:1] == "g":
+            try:
+                game_id = int(command[1:])
+            except ValueError:
+                print("Game number must be a number!")
+                continue
+            if not view.seek("game_id", game_id):
+                print(f"Game {game_id} not found!")
+        elif not view.next_page():
+            return
+
+
+def performance():
+    # vypíše naměřené doby běhu a počítadla (viz modul instrumentation)
+    import instrumentation
+
+    if not instrumentation.enabled:
+        print(f"Instrumentation is disabled! Start the program with "
+              f"{instrumentation.ENV_VAR}=1 (or a .json/.prom file name).")
+    else:
+        print(instrumentation.report())
+        if instrumentation.export_path is not None:
+            instrumentation.export(instrumentation.export_path)
+            print(f"Saved to '{instrumentation.export_path}'")
     input("...")
 
 
@@ -53,11 +122,21 @@ def quit_game():
 
 
 def game_loop():
-    # smyčka hraní her.
+    # smyčka hraní her. Průběh her se zaznamenává do souboru
+    # game_transcript.bin (viz modul 'transcript'). Tajná čísla všech her
+    # se losují z jednoho proudu náhodných čísel.
+    from game import BullsAndCows, GameEngine, secret_rng
+    from transcript import TranscriptWriter
+
+    transcript = TranscriptWriter("game_transcript.bin")
+    rng = secret_rng()
     while True:
         clear()
+        get_global_stats()
         # spusť hru
-        game = BullsAndCows(global_stats if global_stats.valid else None)
+        game = BullsAndCows(global_stats if global_stats.valid else None,
+                            engine=GameEngine(rng=rng),
+                            transcript=transcript)
         game.play()
 
         # pokud možno zapiš statistiky
@@ -84,22 +163,17 @@ def create_menus():
     stats_menu.add_item(1, "Raw Data", func=raw_data)
     stats_menu.add_item(2, "Number of Guesses", func=n_guesses_chart)
     stats_menu.add_item(3, "Time to win", func=time_to_win_chart)
-    stats_menu.add_item(4, "Main Menu", menu=main_menu)
+    stats_menu.add_item(4, "Performance", func=performance)
+    stats_menu.add_item(5, "Main Menu", menu=main_menu)
 
     return main_menu, stats_menu
 
 
 def main():
-    # Hlavní funkce programu. Vytvoří menu, načte soubor se statistikami
-    # minulých her a spustí hlavní smyčku programu
+    # Hlavní funkce programu. Vytvoří menu a spustí hlavní smyčku programu.
+    # Soubor se statistikami minulých her se načte až při prvním použití.
     main_menu, stats_menu = create_menus()
 
-    # noinspection PyGlobalUndefined
-    global global_stats
-    global_stats = Stats("global_game_stats.csv")
-    if global_stats.errors:
-        print("\n".join(global_stats.errors))
-
     Main(main_menu)()
 
 
@@ -0,0 +1,104 @@
+"""Modul s předpočítanou tabulkou odpovědí hry Bulls and Cows.
+
+Platných tajných čísel (4 různé cifry, první cifra není 0) je jen 4536.
+Tabulka obsahuje pro každou dvojici (hádané číslo, tajné číslo) kód
+odpovědi 5 * bulls + cows uložený jako uint8 (cca 20 MB). Při prvním
+použití se tabulka vypočítá a uloží do binárního souboru, poté se už jen
+mapuje do paměti, takže ji všechny procesy sdílí a vyhodnocení je pouhé
+vyhledání v tabulce.
+
+    Typické použití:
+
+    table = get_table()
+    code = table[index_of("1234"), index_of("5678")]
+    bulls, cows = decode(code)
+"""
+
+
+import os
+
+import numpy as np
+
+from game import pack_digits, score_packed, secret_space
+from stats import _get_path
+
+
+N_SECRETS = 4536
+N_CODES = 25  # kódy 0 až 24, ne všechny jsou použité
+
+_table = None
+_index = None
+_numbers = None
+
+
+def encode(bulls, cows):
+    """Vrátí kód odpovědi (integer 0-24)."""
+    return 5 * bulls + cows
+
+
+def decode(code):
+    """Vrátí dvojici (bulls, cows) z kódu odpovědi."""
+    return divmod(int(code), 5)
+
+
+WIN_CODE = encode(4, 0)
+
+
+def index_of(number):
+    """Vrátí index čísla (string nebo list cifer) v tabulce odpovědí."""
+    global _index
+    if _index is None:
+        values = secret_space().astype(np.int16) @ np.array([1000, 100, 10, 1],
+                                                            dtype=np.int16)
+        _index = np.full(10000, -1, dtype=np.int16)
+        _index[values] = np.arange(N_SECRETS)
+
+    number = "".join(number)
+    # délka a cifry se kontrolují předem, jinak by int() selhal nebo
+    # delší číslo vyšlo mimo tabulku indexů (IndexError)
+    if len(number) != 4 or not (number.isascii() and number.isdigit()):
+        raise ValueError(f"'{number}' is not a valid secret number!")
+    index = _index[int(number)]
+    if index < 0:
+        raise ValueError(f"'{number}' is not a valid secret number!")
+    return int(index)
+
+
+def number_of(index):
+    """Vrátí číslo (string) podle indexu v tabulce odpovědí."""
+    global _numbers
+    if _numbers is None:
+        _numbers = tuple("".join(str(digit) for digit in num)
+                         for num in secret_space())
+    return _numbers[index]
+
+
+def build_table(path, chunk_size=512):
+    """Vypočítá tabulku odpovědí a zapíše ji do binárního souboru.
+
+    Soubor se zapíše pod dočasným jménem a poté atomicky přejmenuje, takže
+    ostatní procesy nikdy nevidí rozepsanou tabulku."""
+    secrets = pack_digits(secret_space())
+    table = np.empty((N_SECRETS, N_SECRETS), dtype=np.uint8)
+    for start in range(0, N_SECRETS, chunk_size):
+        bulls, cows = score_packed(secrets[start:start + chunk_size], secrets)
+        table[start:start + chunk_size] = encode(bulls, cows)
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    table.tofile(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def get_table(filename="score_table.bin"):
+    """Vrátí tabulku odpovědí tvaru (4536, 4536) namapovanou do paměti.
+
+    Řádky jsou hádaná čísla, sloupce tajná čísla. Pokud soubor s tabulkou
+    neexistuje nebo nemá správnou velikost, vytvoří ho."""
+    global _table
+    if _table is None:
+        path = _get_path(filename)
+        if not path.exists() or path.stat().st_size != N_SECRETS ** 2:
+            build_table(path)
+        _table = np.memmap(path, dtype=np.uint8, mode="r",
+                           shape=(N_SECRETS, N_SECRETS))
+    return _table
@@ -0,0 +1,232 @@
+"""Asynchronní TCP server pro hru Bulls and Cows.
+
+Každé spojení hraje vlastní hru (GameEngine), všechna spojení sdílí jednu
+instanci Stats. Dohrané hry se nezapisují přímo, ale přes frontu do jediné
+zapisovací úlohy, která je přidává po dávkách a soubor synchronizuje jednou
+za dávku.
+
+Protokol je řádkový:
+    klient: pokus, např. "1234"        server: "<bulls> <cows>"
+    neplatný pokus                     server: "ERR <chyby oddělené '; '>"
+    uhodnuté číslo                     server: "WIN <počet pokusů> <čas>",
+                                       poté začíná nová hra
+    klient: "*"                        server: "BYE <tajné číslo>", konec
+
+Modul obsahuje i zátěžový test, který pustí tisíce souběžných klientů
+hrajících pomocí řešitele a vypíše latenci jednotlivých pokusů.
+
+    Typické použití (z příkazové řádky):
+
+    python server.py serve --port 8765
+    python server.py load-test --port 8765 --clients 2000 --games 5
+"""
+
+
+import argparse
+import asyncio
+from time import perf_counter, perf_counter_ns
+
+import numpy as np
+
+from game import GameEngine, InvalidGuessError, secret_rng
+from score_table import encode, index_of, number_of
+from solver import Solver
+from stats import Stats, StatsCounter
+
+
+class GameServer:
+    """Server hostující souběžné hry.
+
+    Atributy:
+        global_stats: instance třídy Stats, sdílené statistiky (nebo None)
+        max_batch: maximální počet her zapsaných najednou
+        seed:
+            seed tajných čísel (None = náhodná). Každé spojení dostane
+            vlastní proud čísel podle pořadí připojení, hry jsou tak
+            reprodukovatelné.
+        n_sessions: počet aktuálně připojených klientů
+        n_guesses: počet obsloužených pokusů
+        guess_time_ns: celkový čas zpracování pokusů na serveru (ns)
+    """
+
+    def __init__(self, global_stats=None, max_batch=1000, seed=None):
+        self.global_stats = global_stats
+        self.max_batch = max_batch
+        self.seed = seed
+        self.n_sessions = 0
+        self.n_guesses = 0
+        self.guess_time_ns = 0
+
+        self._finished_games = asyncio.Queue()
+        self._n_connections = 0
+
+    def _add_batch(self, batch):
+        # přidá hry do globálních statistik (id jim přidělí až zápis, viz
+        # Stats.flush)
+        for game_stats in batch:
+            self.global_stats.add(game_stats)
+
+    async def _stats_writer(self):
+        # Jediná úloha, která zapisuje do globálních statistik. Bere z fronty
+        # všechny čekající hry (max. 'max_batch') a zapíše je jedním zápisem
+        # do souboru.
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._finished_games.get()]
+            while (len(batch) < self.max_batch
+                   and not self._finished_games.empty()):
+                batch.append(self._finished_games.get_nowait())
+
+            self._add_batch(batch)
+            # Zrušení úlohy nesmí skončit dřív než zápis běžící ve vlákně,
+            # proto se na něj při zrušení ještě počká.
+            flush = loop.run_in_executor(None, self.global_stats.flush)
+            try:
+                await asyncio.shield(flush)
+            except asyncio.CancelledError:
+                await flush
+                raise
+
+    async def handle(self, reader, writer):
+        """Obslouží jedno spojení."""
+        self.n_sessions += 1
+        rng = secret_rng(self.seed, self._n_connections)
+        self._n_connections += 1
+        engine = GameEngine(rng=rng)
+        game_stats = StatsCounter(None)
+        game_stats.start_timer()
+        writer.write(b"Bulls and Cows. Enter your guess ('*' to quit):\n")
+        try:
+            async for line in reader:
+                start = perf_counter_ns()
+                guess = line.decode(errors="replace").strip()
+                if guess == "*":
+                    writer.write(f"BYE {engine.secret_num}\n".encode())
+                    break
+
+                try:
+                    verdict = engine.guess(guess)
+                except InvalidGuessError as e:
+                    writer.write(f"ERR {'; '.join(e.messages)}\n".encode())
+                    continue
+                game_stats.count_guess()
+
+                if engine.won:
+                    game_stats.mark_time()
+                    writer.write(f"WIN {game_stats['n_guesses']} "
+                                 f"{game_stats['time_to_win']}\n".encode())
+                    if self.global_stats is not None:
+                        self._finished_games.put_nowait(game_stats)
+                    engine = GameEngine(rng=rng)
+                    game_stats = StatsCounter(None)
+                    game_stats.start_timer()
+                else:
+                    writer.write(f"{verdict.bulls} {verdict.cows}\n".encode())
+                self.n_guesses += 1
+                self.guess_time_ns += perf_counter_ns() - start
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.n_sessions -= 1
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """Spustí server a obsluhuje klienty až do přerušení."""
+        if self.global_stats is not None:
+            stats_writer = asyncio.create_task(self._stats_writer())
+        server = await asyncio.start_server(self.handle, host, port,
+                                            backlog=4096)
+        print(f"Serving on {host}:{port}")
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                if self.global_stats is not None:
+                    # Počkej na ukončení zapisovací úlohy (i na zápis, který
+                    # právě běží ve vlákně), pak zapiš i hry, které zůstaly
+                    # ve frontě. Jinak by do statistik zapisovala dvě vlákna
+                    # najednou.
+                    stats_writer.cancel()
+                    await asyncio.gather(stats_writer, return_exceptions=True)
+                    batch = []
+                    while not self._finished_games.empty():
+                        batch.append(self._finished_games.get_nowait())
+                    self._add_batch(batch)
+                    self.global_stats.flush()
+                if self.n_guesses:
+                    print(f"{self.n_guesses} guesses, server-side "
+                          f"{self.guess_time_ns / self.n_guesses / 1000:.1f} "
+                          f"us per guess")
+
+
+async def _client(host, port, n_games, latencies):
+    # Klient zátěžového testu: odehraje 'n_games' her pomocí řešitele,
+    # do 'latencies' zapíše doby odezvy jednotlivých pokusů.
+    reader, writer = await asyncio.open_connection(host, port)
+    await reader.readline()
+    solver = Solver("entropy")
+    for _ in range(n_games):
+        solver.reset()
+        while True:
+            guess = solver.next_guess()
+            start = perf_counter()
+            writer.write(f"{number_of(guess)}\n".encode())
+            reply = (await reader.readline()).decode().split()
+            latencies.append(perf_counter() - start)
+            if reply[0] == "WIN":
+                break
+            solver.update(guess, encode(int(reply[0]), int(reply[1])))
+    writer.write(b"*\n")
+    await reader.readline()
+    writer.close()
+
+
+async def load_test(host="127.0.0.1", port=8765, n_clients=1000, n_games=5):
+    """Spustí 'n_clients' souběžných klientů, vypíše latenci pokusů."""
+    index_of("1234")  # připrav převodní tabulky předem
+    latencies = []
+    start = perf_counter()
+    await asyncio.gather(*(_client(host, port, n_games, latencies)
+                           for _ in range(n_clients)))
+    elapsed = perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    print(f"{n_clients} clients, {n_clients * n_games} games, "
+          f"{len(latencies)} guesses in {elapsed:.1f}s")
+    print(f"Guess latency (ms): mean {latencies.mean():.3f}, "
+          f"p50 {np.percentile(latencies, 50):.3f}, "
+          f"p99 {np.percentile(latencies, 99):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulls and Cows server.")
+    parser.add_argument("mode", choices=("serve", "load-test"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stats", default="global_game_stats.csv",
+                        help="stats file in the program folder")
+    parser.add_argument("--clients", type=int, default=1000,
+                        help="load-test: number of concurrent clients")
+    parser.add_argument("--games", type=int, default=5,
+                        help="load-test: games per client")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="serve: seed of the secret numbers")
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        global_stats = Stats(args.stats, batch_size=float("inf"))
+        if global_stats.errors:
+            print("\n".join(global_stats.errors))
+        server = GameServer(global_stats if global_stats.valid else None,
+                            seed=args.seed)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(load_test(args.host, args.port, args.clients, args.games))
+
+
+if __name__ == "__main__":
+    main()
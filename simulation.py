@@ -0,0 +1,149 @@
+"""Modul pro hromadné simulace her Bulls and Cows.
+
+Hry hraje automatický řešitel (modul 'solver') proti herní logice
+GameEngine bez vstupu a výstupu. Hry se rozdělí do bloků, které zpracuje
+pool procesů, výsledky se složí do dataframe se stejnými sloupci jako
+globální statistiky (Stats.df_columns). Čas hry je v sekundách bez
+zaokrouhlení.
+
+Výsledky jsou deterministické: tajná čísla (game.secret_rng) i náhodná
+strategie mají pro každý blok vlastní generátor odvozený ze 'seed' a pořadí
+bloku, nezáleží tedy na počtu procesů.
+
+    Typické použití:
+
+    df = simulate(10 ** 6, strategy="entropy")
+
+    nebo z příkazové řádky:
+
+    python simulation.py -n 1000000 -s entropy -o simulated_stats.csv
+"""
+
+
+import argparse
+from multiprocessing import Pool
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from game import GameEngine, generate_secrets, secret_rng
+from score_table import encode, get_table, number_of
+from solver import STRATEGIES, RandomSolver, Solver
+from stats import Stats
+
+
+PLAYERS = (*STRATEGIES, "random")
+
+
+def _get_player(strategy, seed):
+    # vrátí řešitele pro zadanou strategii
+    if strategy == "random":
+        return RandomSolver(seed)
+    return Solver(strategy)
+
+
+def _play_game(secret_num, player):
+    # Odehraje jednu hru, vrátí počet pokusů a čas hry.
+    engine = GameEngine(secret_num)
+    player.reset()
+    start = perf_counter()
+    while True:
+        guess = player.next_guess()
+        verdict = engine.guess(number_of(guess))
+        if engine.won:
+            return engine.n_guesses, perf_counter() - start
+        player.update(guess, encode(*verdict))
+
+
+def _play_chunk(task):
+    # Odehraje blok her. Spouští se v procesech poolu.
+    chunk_index, n_games, strategy, seed = task
+    secrets = generate_secrets(n_games, secret_rng(seed, chunk_index))
+    player = _get_player(strategy, [seed, chunk_index, 1])
+
+    n_guesses = np.empty(n_games, dtype=np.int32)
+    times = np.empty(n_games, dtype=np.float64)
+    for i, secret_num in enumerate(secrets):
+        n_guesses[i], times[i] = _play_game(secret_num, player)
+    return chunk_index, n_guesses, times
+
+
+def simulate(n_games, strategy="entropy", workers=None, chunk_size=10000,
+             seed=0, first_id=1):
+    """Odehraje 'n_games' her a vrátí jejich statistiky jako dataframe.
+
+    Argumenty:
+        n_games: počet her
+        strategy: strategie řešitele (viz PLAYERS)
+        workers: počet procesů (výchozí je počet jader)
+        chunk_size: počet her v jednom bloku práce
+        seed: seed generátorů náhodných čísel
+        first_id:
+            id první hry, hry mají id po sobě jdoucí (viz Stats.reserve_ids)
+    """
+    if strategy not in PLAYERS:
+        raise ValueError(f"Unknown strategy '{strategy}'! Choose from: "
+                         f"{', '.join(PLAYERS)}")
+
+    # tabulku a první pokus řešitele připrav předem, ať je procesy sdílí
+    # a nepočítají každý znovu
+    get_table()
+    _get_player(strategy, seed).next_guess()
+
+    tasks = [(chunk_index, min(chunk_size, n_games - start), strategy, seed)
+             for chunk_index, start in enumerate(range(0, n_games, chunk_size))]
+
+    n_guesses = np.empty(n_games, dtype=np.int32)
+    times = np.empty(n_games, dtype=np.float64)
+    with Pool(workers) as pool:
+        for chunk_index, chunk_guesses, chunk_times in \
+                pool.imap_unordered(_play_chunk, tasks):
+            start = chunk_index * chunk_size
+            n_guesses[start:start + len(chunk_guesses)] = chunk_guesses
+            times[start:start + len(chunk_times)] = chunk_times
+
+    return pd.DataFrame({"game_id": np.arange(first_id, first_id + n_games),
+                         "n_guesses": n_guesses,
+                         "time_to_win": times},
+                        columns=list(Stats.df_columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mass self-play of Bulls and Cows.")
+    parser.add_argument("-n", "--games", type=int, default=100000,
+                        help="number of games")
+    parser.add_argument("-s", "--strategy", choices=PLAYERS,
+                        default="entropy", help="guessing strategy")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=10000,
+                        help="games per work chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--out", help="save results to a csv file")
+    parser.add_argument("--stats",
+                        help="reserve game ids in this stats file, so they "
+                             "do not clash with its games")
+    args = parser.parse_args()
+
+    first_id = 1
+    if args.stats:
+        first_id = Stats(args.stats, keep_df=False).reserve_ids(
+            args.games).start
+
+    start = perf_counter()
+    df = simulate(args.games, args.strategy, args.workers, args.chunk_size,
+                  args.seed, first_id)
+    elapsed = perf_counter() - start
+
+    print(f"{len(df)} games ({args.strategy}) in {elapsed:.1f}s "
+          f"({len(df) / elapsed:.0f} games/s)")
+    print(f"Guesses: mean {df['n_guesses'].mean():.3f}, "
+          f"max {df['n_guesses'].max()}")
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Modul s automatickým řešitelem hry Bulls and Cows.
+
+Řešitel hádá tajné číslo z prostoru všech platných tajných čísel pomocí
+tabulky odpovědí (modul 'score_table'). Po každé odpovědi vyřadí kandidáty,
+kteří by dali jinou odpověď, a další pokus zvolí podle strategie:
+    - minimax: minimalizuje největší možnou skupinu zbylých kandidátů
+      (Knuthova strategie)
+    - entropy: maximalizuje entropii rozdělení kandidátů podle odpovědí
+    - expected_size: minimalizuje očekávaný počet zbylých kandidátů
+
+Strategie jsou deterministické, zvolené pokusy se proto ukládají podle
+dosavadního průběhu hry a každý uzel herního stromu se počítá jen jednou.
+Samostatně spustitelný: vypíše průměrný počet pokusů každé strategie přes
+všechna tajná čísla.
+
+    Typické použití:
+
+    solver = Solver("entropy")
+    guesses = solver.solve("1234")  # seznam pokusů až po uhodnutí
+"""
+
+
+import numpy as np
+
+from score_table import (N_CODES, N_SECRETS, WIN_CODE, get_table, index_of,
+                         number_of)
+from stats import Stats
+
+
+def _minimax_score(sizes, n_candidates):
+    # velikost největší skupiny kandidátů
+    return sizes.max(axis=1).astype(np.float64)
+
+
+def _expected_size_score(sizes, n_candidates):
+    # očekávaný počet kandidátů, kteří zbydou po odpovědi
+    return (sizes.astype(np.float64) ** 2).sum(axis=1) / n_candidates
+
+
+def _entropy_score(sizes, n_candidates):
+    # záporná entropie rozdělení (menší je lepší jako u ostatních strategií)
+    sizes = sizes.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weighted = np.where(sizes > 0, sizes * np.log2(sizes), 0.0)
+    return weighted.sum(axis=1) / n_candidates - np.log2(n_candidates)
+
+
+STRATEGIES = {"minimax": _minimax_score,
+              "entropy": _entropy_score,
+              "expected_size": _expected_size_score}
+
+# zvolené pokusy podle (strategie, průběh hry)
+_guess_cache = {}
+
+
+def _partition_sizes(table, candidates, chunk_size=512):
+    # Pro každý možný pokus spočítá, kolik kandidátů dá kterou odpověď.
+    # Vrací matici tvaru (4536, N_CODES).
+    sizes = np.empty((N_SECRETS, N_CODES), dtype=np.int64)
+    for start in range(0, N_SECRETS, chunk_size):
+        codes = table[start:start + chunk_size, candidates].astype(np.int64)
+        codes += np.arange(len(codes))[:, None] * N_CODES
+        sizes[start:start + chunk_size] = np.bincount(
+            codes.ravel(), minlength=len(codes) * N_CODES).reshape(-1, N_CODES)
+    return sizes
+
+
+class Solver:
+    """Řešitel hry Bulls and Cows.
+
+    Atributy:
+        strategy: název strategie (klíč slovníku STRATEGIES)
+        table: tabulka odpovědí
+        candidates: pole indexů tajných čísel, která odpovídají všem verdiktům
+        history: tuple dvojic (index pokusu, kód odpovědi)
+    """
+
+    def __init__(self, strategy="minimax"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'! Choose from: "
+                             f"{', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.table = get_table()
+        self.reset()
+
+    def reset(self):
+        """Připraví řešitele na novou hru."""
+        self._candidates = np.arange(N_SECRETS)
+        self._unapplied = []
+        self.history = ()
+
+    @property
+    def candidates(self):
+        # Kandidáti se prořezávají líně, až když jsou potřeba. Pokud je další
+        # pokus už v cache, prořezání se vůbec nepočítá.
+        for guess, code in self._unapplied:
+            consistent = self.table[guess, self._candidates] == code
+            self._candidates = self._candidates[consistent]
+        self._unapplied = []
+        return self._candidates
+
+    def next_guess(self):
+        """Vrátí index dalšího pokusu."""
+        key = (self.strategy, self.history)
+        guess = _guess_cache.get(key)
+        if guess is None:
+            guess = self._choose_guess()
+            _guess_cache[key] = guess
+        return guess
+
+    def _choose_guess(self):
+        # Zvolí pokus s nejlepším skóre. Při shodě dá přednost kandidátovi
+        # (může rovnou vyhrát), jinak pokusu s nejmenším indexem.
+        candidates = self.candidates
+        n_candidates = len(candidates)
+        if n_candidates <= 2:
+            return int(candidates[0])
+
+        sizes = _partition_sizes(self.table, candidates)
+        score = STRATEGIES[self.strategy](sizes, n_candidates)
+
+        best = np.flatnonzero(np.isclose(score, score.min()))
+        best_candidates = np.intersect1d(best, candidates)
+        return int(best_candidates[0] if len(best_candidates) else best[0])
+
+    def update(self, guess, code):
+        """Vyřadí kandidáty, kteří neodpovídají verdiktu.
+
+        Argumenty:
+            guess: index pokusu
+            code: kód odpovědi (viz score_table.encode)
+        """
+        self._unapplied.append((guess, code))
+        self.history += ((guess, code),)
+
+    def solve(self, secret):
+        """Uhodne tajné číslo, vrátí list pokusů (stringů)."""
+        secret_index = index_of(secret)
+        self.reset()
+        guesses = []
+        while True:
+            guess = self.next_guess()
+            code = int(self.table[guess, secret_index])
+            guesses.append(number_of(guess))
+            if code == WIN_CODE:
+                return guesses
+            self.update(guess, code)
+
+
+class RandomSolver(Solver):
+    """Řešitel, který hádá náhodně zvoleného kandidáta.
+
+    Slouží jako jednoduchá základní úroveň pro srovnání se strategiemi.
+    Pokusy nejsou deterministické, proto se neukládají do cache.
+
+    Atributy:
+        rng: generátor náhodných čísel (numpy Generator)
+        Ostatní viz třída Solver."""
+
+    def __init__(self, seed=None):
+        self.strategy = "random"
+        self.rng = np.random.default_rng(seed)
+        self.table = get_table()
+        self.reset()
+
+    def next_guess(self):
+        """Vrátí index náhodně zvoleného kandidáta."""
+        candidates = self.candidates
+        return int(candidates[self.rng.integers(len(candidates))])
+
+
+def main():
+    global_stats = Stats("global_game_stats.csv")
+    if global_stats.valid:
+        print(f"players: {global_stats['n_guesses'].mean():.3f} guesses "
+              f"on average")
+
+    for strategy in STRATEGIES:
+        solver = Solver(strategy)
+        n_guesses = np.array([len(solver.solve(number_of(i)))
+                              for i in range(N_SECRETS)])
+        print(f"{strategy}: {n_guesses.mean():.3f} guesses on average, "
+              f"at most {n_guesses.max()}")
+
+
+if __name__ == "__main__":
+    main()
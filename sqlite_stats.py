@@ -0,0 +1,306 @@
+"""Modul se statistikami Bulls and Cows uloženými v databázi SQLite.
+
+SqliteStats má stejné rozhraní jako Stats (add, __getitem__, empty, next_id,
+aggregates, value_counts), takže ji lze předat hře i hlavnímu programu místo
+csv statistik. Data se ale nenačítají do paměti: agregáty, histogramy
+a nejlepší hry se počítají dotazy nad indexy v databázi. Databáze běží
+v režimu WAL, takže do ní může souběžně zapisovat více procesů a čtení
+neblokuje zápis.
+
+    Typické použití:
+
+    csv_to_sqlite("global_game_stats.csv", "global_game_stats.sqlite")
+    global_stats = SqliteStats("global_game_stats.sqlite")
+    global_stats.aggregates["n_guesses"].mean  # průměr pomocí SQL
+    global_stats.top("n_guesses", 10)  # 10 her s nejméně pokusy
+"""
+
+
+import sqlite3
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from stats import (RunningStats, Stats, _get_path, _missing_columns,
+                   _validate_df)
+
+
+def _bin_key(col):
+    # SQL výraz indexu třídy histogramu sloupce (viz Stats.bin_widths),
+    # celočíselný sloupec s šířkou třídy 1 je třídou sám
+    binwidth = Stats.bin_widths[col]
+    if binwidth == 1:
+        return col
+    return f"CAST(ROUND({col} / {binwidth}) AS INTEGER)"
+
+
+# Sloupec game_id je primární klíč (index tabulky). Histogram času se
+# seskupuje podle výrazu, index nad výrazem umožní seskupit bez řazení.
+# Tabulka id_allocator drží další volné id včetně rezervovaných id.
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY,
+    n_guesses INTEGER NOT NULL CHECK (n_guesses > 0),
+    time_to_win REAL NOT NULL CHECK (time_to_win > 0)
+);
+CREATE INDEX IF NOT EXISTS games_n_guesses ON games (n_guesses);
+CREATE INDEX IF NOT EXISTS games_time_to_win_bin
+    ON games ({_bin_key("time_to_win")});
+CREATE TABLE IF NOT EXISTS id_allocator (next_id INTEGER NOT NULL);
+"""
+
+
+def _connect(path):
+    # otevře databázi v režimu WAL a vytvoří tabulku s indexy
+    connection = sqlite3.connect(path, check_same_thread=False,
+                                 isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+class _LazyAggregates(dict):
+    # Slovník agregátů sloupců, agregát se dotazem spočítá až při prvním
+    # přístupu ke sloupci.
+
+    def __init__(self, compute):
+        super().__init__()
+        self._compute = compute
+
+    def __missing__(self, col):
+        self[col] = self._compute(col)
+        return self[col]
+
+
+class SqliteStats(Stats):
+    """Statistiky minulých her v databázi SQLite.
+
+    Rozhraní je stejné jako u třídy Stats. Hry se do databáze zapisují po
+    dávkách (jedna transakce na dávku), ve které dostanou další volná id.
+    Hry zapsané jinými procesy jsou vidět
+    okamžitě, metoda refresh jen zneplatní uložené agregáty.
+
+    Atributy:
+        path: absolutní cesta k databázi
+        valid: bool jestli se databázi podařilo otevřít
+        errors: list stringů chyb
+        df: dataframe všech her (sestaví se při každém přístupu)
+        aggregates:
+            slovník instancí RunningStats s agregáty sloupců spočítanými
+            pomocí SQL (počítají se při prvním přístupu ke sloupci)
+        batch_size: počet nových her, po kterém se zapíší do databáze
+        version: počítadlo změn dat
+    """
+
+    def __init__(self, filename, batch_size=1):
+        """Otevře databázi (pokud neexistuje, vytvoří prázdnou).
+
+        Argumenty:
+            filename:
+                Název databáze. Soubor musí být v pracovní složce programu
+            batch_size:
+                Po kolika nových hrách se mají zapsat do databáze.
+        """
+        self.path = _get_path(filename)
+        self.batch_size = batch_size
+        self.keep_df = False
+
+        self.valid = True
+        self.errors = []
+        self.version = 0
+        self._rejected = {}
+
+        self._unwritten_rows = []
+        self._aggregates = None
+        self._data_version = None
+        try:
+            self._connection = _connect(self.path)
+        except sqlite3.DatabaseError as e:
+            self._connection = None
+            self.valid = False
+            self.errors.append(f"Stats import failed! {e}!")
+
+    def _query(self, sql, parameters=()):
+        return self._connection.execute(sql, parameters)
+
+    def __aggregate(self, col):
+        # Spočítá agregáty sloupce. Histogram seskupením podle indexu,
+        # ostatní agregáty jedním průchodem tabulky. U celočíselného sloupce
+        # s šířkou třídy 1 je histogram přesný a agregáty se z něj dopočítají.
+        aggregate = RunningStats(Stats.bin_widths[col])
+        if aggregate.binwidth is not None:
+            aggregate.bins = dict(self._query(
+                f"SELECT {_bin_key(col)} AS bin, COUNT(*) FROM games "
+                f"GROUP BY bin"))
+
+        if aggregate.binwidth == 1 and Stats.df_types[col] is int:
+            keys = np.fromiter(aggregate.bins.keys(), dtype=np.int64)
+            counts = np.fromiter(aggregate.bins.values(), dtype=np.int64)
+            aggregate.count = int(counts.sum())
+            aggregate.total = int(keys @ counts)
+            aggregate.total_sq = float(np.square(keys, dtype=np.float64)
+                                       @ counts)
+            if len(keys):
+                aggregate.min, aggregate.max = int(keys.min()), \
+                    int(keys.max())
+        else:
+            (aggregate.count, total, aggregate.total_sq, aggregate.min,
+             aggregate.max) = self._query(
+                f"SELECT COUNT({col}), SUM({col}), TOTAL({col} * {col}), "
+                f"MIN({col}), MAX({col}) FROM games").fetchone()
+            aggregate.total = total or 0
+        return aggregate
+
+    @property
+    def aggregates(self):
+        """Slovník agregátů sloupců (instance RunningStats)."""
+        self.refresh()
+        if self._aggregates is None:
+            self._aggregates = _LazyAggregates(self.__aggregate)
+        return self._aggregates
+
+    @property
+    def df(self):
+        """Dataframe všech her seřazených podle id."""
+        return pd.DataFrame({col: self[col] for col in Stats.df_columns})
+
+    def __getitem__(self, col):
+        """Vrátí sloupec 'col' seřazený podle id hry."""
+        if col not in Stats.df_types:
+            raise KeyError(col)
+        n_rows = self._query("SELECT COUNT(*) FROM games").fetchone()[0]
+        values = np.fromiter(
+            chain.from_iterable(
+                self._query(f"SELECT {col} FROM games ORDER BY game_id")),
+            dtype=Stats.df_types[col], count=n_rows)
+        return pd.Series(values, name=col)
+
+    def top(self, col, n=10, largest=False):
+        """Vrátí dataframe 'n' her s nejmenší (nebo největší) hodnotou
+        sloupce 'col'."""
+        if col not in Stats.df_types:
+            raise KeyError(col)
+        order = "DESC" if largest else "ASC"
+        rows = self._query(
+            f"SELECT {', '.join(Stats.df_columns)} FROM games "
+            f"ORDER BY {col} {order}, game_id LIMIT ?", (n,)).fetchall()
+        return pd.DataFrame(rows, columns=Stats.df_columns).astype(
+            Stats.df_types)
+
+    @property
+    def empty(self):
+        """Bool, jestli jsou statistiky prázdné."""
+        return self._query(
+            "SELECT NOT EXISTS (SELECT 1 FROM games)").fetchone()[0] == 1
+
+    @property
+    def next_id(self):
+        """Integer, další volné id hry (největší id hledá v indexu)."""
+        return self._query(
+            "SELECT MAX((SELECT IFNULL(MAX(next_id), 1) FROM id_allocator), "
+            "(SELECT IFNULL(MAX(game_id), 0) + 1 FROM games))").fetchone()[0]
+
+    def __reserve_ids(self, n):
+        # Přidělí 'n' po sobě jdoucích id. Volá se v zapisovací transakci.
+        first_id = self.next_id
+        self._query("DELETE FROM id_allocator")
+        self._query("INSERT INTO id_allocator VALUES (?)", (first_id + n,))
+        return range(first_id, first_id + n)
+
+    def reserve_ids(self, n):
+        """Rezervuje 'n' po sobě jdoucích id her, vrátí je jako range."""
+        with self._connection:
+            self._query("BEGIN IMMEDIATE")
+            return self.__reserve_ids(n)
+
+    def refresh(self):
+        """Zneplatní agregáty, pokud do databáze mezitím zapsal jiný
+        proces."""
+        data_version = self._query("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            if self._data_version is not None:
+                self.version += 1
+            self._data_version = data_version
+            self._aggregates = None
+
+    def flush(self):
+        """Zapíše dosud nezapsané hry do databáze jednou transakcí, ve které
+        jim přidělí další volná id.
+
+        Pokud databáze dávku odmítne (porušení omezení tabulky), dávka se
+        zahodí a do 'errors' se zapíše varování, aby se chybná dávka
+        nezkoušela zapsat znovu. Při jiné chybě (např. zamčená databáze) se
+        dávka vrátí mezi nezapsané hry."""
+        if not self._unwritten_rows:
+            return
+        rows, self._unwritten_rows = self._unwritten_rows, []
+        try:
+            with self._connection:
+                self._query("BEGIN IMMEDIATE")
+                ids = self.__reserve_ids(len(rows))
+                self._connection.executemany(
+                    f"INSERT INTO games ({', '.join(Stats.df_columns)}) "
+                    f"VALUES (?, ?, ?)",
+                    ((game_id, *row[1:]) for game_id, row in zip(ids, rows)))
+        except sqlite3.IntegrityError as e:
+            self.errors.append(f"Warning! Removed {len(rows)} new game(s) "
+                               f"rejected by the database: {e}!")
+            return
+        except BaseException:
+            self._unwritten_rows = rows + self._unwritten_rows
+            raise
+        self.version += len(rows)
+        self._aggregates = None
+
+    def compact(self):
+        """Zapíše nezapsané hry, převede WAL log do databáze a zmenší
+        soubor databáze."""
+        self.flush()
+        # VACUUM zapisuje přes WAL log, převádí se proto až po něm
+        self._query("VACUUM")
+        self._query("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """Zapíše nezapsané hry a zavře databázi."""
+        self.flush()
+        self._connection.close()
+
+
+def csv_to_sqlite(csv_filename, sqlite_filename, chunksize=10 ** 6):
+    """Převede csv soubor statistik do databáze SQLite.
+
+    Csv soubor čte a validuje po blocích, nevalidní řádky vynechá. Id her se
+    zachovají.
+
+    Argumenty:
+        csv_filename: název zdrojového csv souboru v pracovní složce programu
+        sqlite_filename: název databáze (pokud existuje, hry se do ní přidají)
+        chunksize: počet řádků čtených najednou
+
+    Vrací:
+        počet převedených řádků
+
+    Vyvolává:
+        ValueError: ve zdrojovém souboru chybí sloupce.
+    """
+    connection = _connect(_get_path(sqlite_filename))
+    n_rows = 0
+    try:
+        for chunk in pd.read_csv(_get_path(csv_filename), chunksize=chunksize):
+            missing_columns = _missing_columns(chunk)
+            if missing_columns:
+                raise ValueError(f"Column(s) '{','.join(missing_columns)}' "
+                                 f"are missing!")
+            chunk, _, _ = _validate_df(chunk)
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    f"INSERT INTO games ({', '.join(Stats.df_columns)}) "
+                    f"VALUES (?, ?, ?)",
+                    chunk.itertuples(index=False, name=None))
+            n_rows += len(chunk)
+    finally:
+        connection.close()
+    return n_rows
@@ -14,15 +14,46 @@ StatsCounter je počítadlo pro jednotlivé hry.
     game_stats.mark_time()  # zaznamenání času
 
     global_stats.add(game_stats)  # přidání do globálních statistik
+
+Hra se do statistik přidává jako záznam GameRecord (n-tice bez slovníku
+a bez pandas), záznamy se do dataframe převádějí hromadně až při přístupu
+k atributu 'df'.
+
+Statistiky lze uložit i do sloupcového binárního úložiště (složka
+s příponou '.cols', jeden soubor na sloupec), které se při otevření pouze
+mapuje do paměti:
+
+    csv_to_columns("global_stats.csv", "global_stats.cols")
+    global_stats = Stats("global_stats.cols")
+
+Do jednoho souboru může souběžně zapisovat více procesů. Soubor slouží jako
+log, do kterého se hry pouze připisují. Každý zápis probíhá pod zámkem
+souboru (modul 'locking'). Pod zámkem se nejdřív načtou hry, které mezitím
+připsaly jiné procesy, a teprve pak se novým hrám přidělí id. Na disk se
+zápisy synchronizují skupinově: jedna synchronizace potvrdí zápisy všech
+procesů, které do té doby zapsaly (skupinový commit). Načítání zámek
+nedrží, čte jen zápisy dokončené při otevření souboru. Soubor zámku
+vytvoří až první zápis.
 """
 
+import io
+import os
+import shutil
+from collections import namedtuple
 from pathlib import Path
 from time import time
 
+import numpy as np
 from numpy import nan
 import pandas as pd
-from pandera import DataFrameSchema, Column, Check, errors
-import pandera.errors
+
+from instrumentation import count, timed, timer
+from locking import FileLock
+
+
+# nejvýše tolik řádků se do agregátů přičítá po jednom (RunningStats.add),
+# pro víc je rychlejší hromadný RunningStats.update
+_SMALL_BATCH = 16
 
 
 def _get_path(filename):
@@ -31,118 +62,734 @@ def _get_path(filename):
     return path
 
 
+def _missing_columns(df):
+    # vrátí list sloupců, které v dataframe chybí
+    return [col for col in Stats.df_columns if col not in df.columns]
+
+
+def _sidecar_path(path, suffix):
+    # vrátí cestu k pomocnému souboru úložiště (vedle úložiště)
+    return path.with_name(path.name + suffix)
+
+
+class _IdFile:
+    # Soubor s dalším volným id hry (vedle úložiště). Zapisuje se pod
+    # zámkem úložiště a atomicky, číst ho lze i bez zámku. Id se přidělují
+    # monotónně a nikdy znovu, ani když rezervované id nebylo použito.
+    # Hodnota může chybět nebo zaostávat za daty (např. po pádu programu),
+    # proto se bere maximum s id v datech.
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        # vrátí uložené další volné id (1 pokud soubor neexistuje)
+        try:
+            return int(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return 1
+
+    def write(self, next_id, sync=False):
+        # Zapíše id atomicky: do dočasného souboru, který pak nahradí
+        # původní. Pád uprostřed zápisu tak nezanechá useknutý soubor. Na
+        # disk se soubor synchronizuje jen se 'sync'. Id zapsaných her se po
+        # pádu obnoví z dat, synchronizovat je tak třeba jen rezervovaná id
+        # bez her (reserve_ids).
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as file:
+            file.write(str(next_id))
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class _SyncMark:
+    # Skupinový commit zápisů více procesů. Procesy připisují hry bez
+    # synchronizace na disk a pak zavolají sync. Soubor značky (vedle
+    # úložiště, s vlastním souborem zámku synchronizace) obsahuje pozici
+    # (inode, velikost), do které je úložiště synchronizované. Proces, který
+    # zámek dostane, synchronizuje vše připsané do té doby (i zápisy
+    # ostatních procesů) a posune značku. Procesy čekající na zámek pak
+    # svůj zápis najdou pod značkou a znovu nesynchronizují. Značka se
+    # zapisuje až po synchronizaci dat, po pádu tak nikdy neukazuje za
+    # synchronizovaná data.
+
+    def __init__(self, path):
+        self.path = path
+        # Zámek je v samostatném souboru: na Windows jsou zámky msvcrt
+        # povinné a čtení a zápis značky jiným handle by selhaly.
+        self.lock = FileLock(_sidecar_path(path, ".lock"))
+
+    def read(self):
+        # vrátí uloženou pozici (None pokud chybí)
+        try:
+            ino, size = self.path.read_text().split()
+            return int(ino), int(size)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def sync(self, store, position):
+        # Zajistí, že úložiště 'store' je na disku synchronizované alespoň
+        # do pozice 'position' (dvojice inode, velikost). Vrací True, pokud
+        # synchronizoval tento proces.
+        with self.lock:
+            synced = self.read()
+            current = store.sync_position()
+            # značka za koncem úložiště (úložiště bylo mezitím zkráceno) je
+            # neplatná
+            if synced is not None and synced[0] == position[0] \
+                    and position[1] <= synced[1] <= current[1]:
+                return False
+            position = current
+            store.fsync()
+            self.path.write_text(f"{position[0]} {position[1]}")
+        return True
+
+
+def _check_record(record):
+    # Zkontroluje záznam hry stejně jako _validate_df (bez id, které hra
+    # dostane až při zápisu). Vrátí None pro validní záznam, jinak popis
+    # chyby ve tvaru hlášky validace ("wrong data type"/"invalid values").
+    values = record[1:]
+    for value, dtype in zip(values, list(Stats.df_types.values())[1:]):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return "wrong data type"
+        if np.isnan(value) or (dtype is int and not value.is_integer()):
+            return "wrong data type"
+    if not all(float(value) > 0 for value in values):
+        return "invalid values"
+    return None
+
+
+def _validate_df(df):
+    # Zvaliduje dataframe jedním průchodem pomocí booleovských masek,
+    # vrátí trojici (dataframe bez chybných řádků, počet řádků se
+    # špatným typem, počet řádků s neplatnou hodnotou).
+
+    # převeď sloupce na čísla, nečíselné hodnoty (a u celočíselných
+    # sloupců i hodnoty s desetinnou částí) jsou chybný typ
+    columns = {}
+    bad_types = np.zeros(len(df), dtype=bool)
+    for col, dtype in Stats.df_types.items():
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy()
+        bad_types |= np.isnan(values)
+        if dtype is int and values.dtype.kind == "f":
+            bad_types |= np.mod(values, 1) != 0
+        columns[col] = values
+
+    # hodnoty musí být kladné (kontroluje se jen u řádků se správným typem)
+    bad_values = np.zeros(len(df), dtype=bool)
+    for values in columns.values():
+        with np.errstate(invalid="ignore"):
+            bad_values |= ~(values > 0)
+    bad_values &= ~bad_types
+
+    keep = ~(bad_types | bad_values)
+    df = pd.DataFrame({col: columns[col][keep].astype(dtype)
+                       for col, dtype in Stats.df_types.items()},
+                      index=df.index[keep])
+    return df, int(bad_types.sum()), int(bad_values.sum())
+
+
+class _BoundedFile(io.RawIOBase):
+    # Binární soubor pro čtení, který končí na zadané velikosti (data
+    # připsaná později nejsou vidět).
+
+    def __init__(self, file, size):
+        self._file = file
+        self._size = size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_END:
+            offset, whence = self._size + offset, os.SEEK_SET
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def readinto(self, buffer):
+        n = max(min(len(buffer), self._size - self._file.tell()), 0)
+        return self._file.readinto(memoryview(buffer)[:n])
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class _CsvStore:
+    # Úložiště statistik v csv souboru. Nové hry se připisují na konec.
+    # Pozice v souboru je dvojice (inode, velikost souboru). Soubor zámku
+    # vytvoří až první zápis, čtení zámek bere jen krátce a jen pokud už
+    # soubor zámku existuje (viz open).
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = FileLock(_sidecar_path(path, ".lock"))
+        self.ids = _IdFile(_sidecar_path(path, ".ids"))
+        self.synced = _SyncMark(_sidecar_path(path, ".sync"))
+
+    def open(self):
+        # Otevře soubor ke čtení, vrátí dvojici (soubor omezený na zápisy
+        # dokončené při otevření, pozice jeho konce). Velikost se zjistí pod
+        # zámkem, samotné čtení už zámek nedrží. Pokud soubor zámku po
+        # prvním zjištění velikosti neexistuje, do souboru ještě nikdo
+        # nezapisoval (zapisovatel vytvoří zámek před zápisem) a velikost
+        # platí bez zámku.
+        file = open(self.path, "rb", buffering=0)
+        try:
+            stat = os.fstat(file.fileno())
+            if self.lock.path.exists():
+                with self.lock:
+                    stat = os.fstat(file.fileno())
+        except BaseException:
+            file.close()
+            raise
+        return (io.BufferedReader(_BoundedFile(file, stat.st_size)),
+                (stat.st_ino, stat.st_size))
+
+    def position(self):
+        # vrátí pozici konce souboru (None pokud soubor neexistuje)
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def read_tail(self, position, n_rows):
+        # Vrátí dvojici (zvalidovaný dataframe řádků zapsaných za pozicí
+        # 'position' nebo None, nová pozice). Pokud byl soubor mezitím
+        # přepsán (compact v jiném procesu), obsahuje jen validní řádky
+        # a prvních 'n_rows' z nich je už načtených.
+        try:
+            file, new_position = self.open()
+        except FileNotFoundError:
+            return None, None
+        with file:
+            if new_position == position:
+                return None, new_position
+            if position is not None and position[0] == new_position[0]:
+                file.seek(position[1])
+                df = pd.read_csv(io.BytesIO(file.read()), header=None,
+                                 names=Stats.df_columns)
+            else:
+                df = pd.read_csv(file).iloc[n_rows:]
+        return _validate_df(df)[0], new_position
+
+    def sync_position(self):
+        # pozice konce souboru pro skupinový commit (viz _SyncMark)
+        return self.position()
+
+    def fsync(self):
+        # synchronizuje soubor na disk
+        with open(self.path, "ab") as file:
+            os.fsync(file.fileno())
+
+    def append(self, columns):
+        # Připíše sloupce (slovník sekvencí) na konec souboru. Na disk se
+        # soubor synchronizuje zvlášť (fsync, skupinově viz _SyncMark).
+        lines = "".join(f"{game_id},{n_guesses},{time_to_win}\n"
+                        for game_id, n_guesses, time_to_win
+                        in zip(*columns.values()))
+        with open(self.path, "a+b") as file:
+            # pokud soubor nekončí novým řádkem, doplň ho
+            if file.seek(0, os.SEEK_END) > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    lines = "\n" + lines
+            file.write(lines.encode())
+
+    def rewrite(self, df):
+        # přepíše celý soubor dataframem
+        tmp_path = self.path.with_suffix(".tmp")
+        df.to_csv(tmp_path, index=False)
+        with open(tmp_path, "ab") as file:
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class _ColumnStore:
+    # Sloupcové binární úložiště: složka s jedním souborem na sloupec,
+    # hodnoty v úsporných typech (Stats.df_dtypes, little-endian) bez
+    # hlavičky. Nové hry se připisují na konec souborů.
+
+    suffix = ".cols"
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = FileLock(_sidecar_path(path, ".lock"))
+        self.ids = _IdFile(_sidecar_path(path, ".ids"))
+        self.synced = _SyncMark(_sidecar_path(path, ".sync"))
+        self.dtypes = {col: np.dtype(dtype).newbyteorder("<")
+                       for col, dtype in Stats.df_dtypes.items()}
+
+    def _column_path(self, col, path=None):
+        return (path or self.path) / f"{col}.bin"
+
+    def position(self):
+        # Vrátí počet celých řádků (None pokud úložiště neexistuje). Délka je
+        # daná nejkratším sloupcem, takže nedokončený zápis se ignoruje.
+        if not self.path.is_dir():
+            return None
+        return min(self._column_path(col).stat().st_size // dtype.itemsize
+                   for col, dtype in self.dtypes.items())
+
+    def read_tail(self, position, n_rows):
+        # Vrátí dvojici (dataframe řádků za pozicí 'position' nebo None,
+        # nová pozice). Přepsání úložiště zachovává řádky i jejich pořadí,
+        # pozice proto platí i po něm.
+        columns = self.open()
+        if columns is None:
+            return None, None
+        new_position = len(columns["game_id"])
+        if new_position == (position or 0):
+            return None, new_position
+        return pd.DataFrame({col: np.array(values[position or 0:])
+                             for col, values in columns.items()}), new_position
+
+    def open(self):
+        # Namapuje sloupce do paměti, vrátí slovník polí (None pokud
+        # úložiště neexistuje).
+        length = self.position()
+        if length is None:
+            return None
+        if length == 0:
+            return {col: np.zeros(0, dtype=dtype)
+                    for col, dtype in self.dtypes.items()}
+        return {col: np.memmap(self._column_path(col), dtype=dtype, mode="r",
+                               shape=(length,))
+                for col, dtype in self.dtypes.items()}
+
+    def create(self):
+        # vytvoří prázdné úložiště (existující přepíše)
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        self.path.mkdir(parents=True)
+        for col in self.dtypes:
+            self._column_path(col).touch()
+
+    def sync_position(self):
+        # pozice pro skupinový commit (viz _SyncMark): inode složky (přepsání
+        # úložiště ho změní) a počet celých řádků
+        return self.path.stat().st_ino, self.position()
+
+    def fsync(self):
+        # synchronizuje soubory sloupců na disk
+        for col in self.dtypes:
+            with open(self._column_path(col), "ab") as file:
+                os.fsync(file.fileno())
+
+    def append(self, columns):
+        # Připíše sloupce (slovník sekvencí) na konec souborů, na disk se
+        # synchronizují zvlášť (fsync). Volá se pod zámkem. Sloupce se
+        # nejdřív zkrátí na počet celých řádků, aby nedokončený zápis (pád
+        # uprostřed zápisu) neposunul nové hodnoty proti ostatním sloupcům.
+        n_rows = self.position()
+        for col, dtype in self.dtypes.items():
+            with open(self._column_path(col), "ab") as file:
+                file.truncate(n_rows * dtype.itemsize)
+                file.write(np.asarray(columns[col], dtype=dtype).tobytes())
+
+    def rewrite(self, df):
+        # Přepíše celé úložiště dataframem. Staré úložiště se nejdřív
+        # přejmenuje stranou a smaže se až po přesunutí nového, pád programu
+        # tak nikdy nesmaže obě verze.
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        old_path = self.path.with_name(self.path.name + ".old")
+        tmp_store = _ColumnStore(tmp_path)
+        tmp_store.create()
+        tmp_store.append({col: df[col].to_numpy() for col in self.dtypes})
+        tmp_store.fsync()
+        if old_path.exists():
+            shutil.rmtree(old_path)
+        os.replace(self.path, old_path)
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(old_path)
+
+
 class Stats:
     """Třída pro práci se statistikami minulých her.
 
     Stará se o import dat z csv souboru a jejich validaci.
-    Nové statistiky se přidávají pomocí instance třídy StatsCounter
+    Nové statistiky se přidávají pomocí instance třídy StatsCounter.
+    Nové hry se do souboru pouze připisují na konec, celý soubor se
+    přepisuje jen při explicitním zavolání metody compact.
+
+    Do souboru smí zapisovat více procesů najednou. Hry se do statistik
+    započítají až při zápisu do souboru (flush), kdy pod zámkem souboru
+    dostanou id navazující na hry všech procesů. Hry zapsané jinými procesy
+    se načítají při zápisu a při volání metody refresh. Další volné id se
+    uchovává v souboru vedle statistik (přípona '.ids'), takže next_id
+    nemusí procházet data a id lze rezervovat i hromadně (reserve_ids).
+
+    Pokud má zdroj příponu '.cols', je to sloupcové binární úložiště
+    (viz csv_to_columns). To se při otevření jen namapuje do paměti,
+    nevaliduje se (data se validují při převodu) a dataframe i agregáty
+    se sestaví až při prvním použití. Jednotlivé sloupce vrací
+    __getitem__ bez kopírování.
 
     Atributy:
-        path: Absolutní cesta k csv souboru.
+        path: Absolutní cesta k csv souboru (nebo ke sloupcovému úložišti).
         valid: bool jestli je soubor nebo importovaná data validní
         errors: list stringů chyb a varování
-        df: dataframe načtených dat
+        df: dataframe načtených dat (None pokud keep_df je False)
+        keep_df: bool, jestli se uchovává celý dataframe
+        aggregates:
+            slovník instancí RunningStats s průběžnými agregáty sloupců
+            (u sloupcového úložiště se počítají až při prvním použití)
+        batch_size:
+            počet nových her, po kterém se zapíší do souboru
+            (jedním zápisem pod zámkem a jednou synchronizací na disk)
+        version:
+            počítadlo změn dat, zvyšuje se s každou započtenou hrou
+            (např. pro platnost cache odvozených výsledků)
 
     Atributy třídy:
         df_columns: správné názvy sloupců dataframe
+        df_types: správné typy sloupců dataframe
+        df_dtypes: úsporné typy sloupců při čtení po blocích
+        bin_widths: šířky tříd histogramu průběžných agregátů sloupců
     """
 
     df_columns = "game_id", "n_guesses", "time_to_win"
+    df_types = {"game_id": int, "n_guesses": int, "time_to_win": float}
+    df_dtypes = {"game_id": "int32", "n_guesses": "int32",
+                 "time_to_win": "float32"}
+    bin_widths = {"game_id": None, "n_guesses": 1, "time_to_win": 0.01}
 
-    def __init__(self, filename):
+    def __init__(self, filename, batch_size=1, chunksize=None, keep_df=True):
         """Ze zadaného csv souboru načte data a zvaliduje je.
 
         Argumenty:
             filename:
                 Název zdrojového souboru.
                 Soubor musí být v pracovní složce programu
+            batch_size:
+                Po kolika nových hrách se mají zapsat do souboru.
+            chunksize:
+                Pokud je zadán, soubor se čte a validuje po blocích
+                o tolika řádcích a sloupce mají úsporné typy (df_dtypes).
+            keep_df:
+                Jestli uchovávat celý dataframe. Pokud ne, jsou k dispozici
+                pouze průběžné agregáty (atribut aggregates).
         """
         self.path = _get_path(filename)
+        self.batch_size = batch_size
 
         self.valid = True
         self.errors = []
+        self.version = 0
+        # druh chyby odmítnutých nových her: (počet, index varování)
+        self._rejected = {}
+
+        # řádky přidané od posledního sestavení dataframe
+        # a řádky dosud nezapsané do souboru
+        self._new_rows = []
+        self._unwritten_rows = []
+        # pozice konce dat v úložišti, do které jsou hry načtené
+        self._position = None
+        # další volné id, obnovené ze souboru id a z načtených dat
+        self._next_id = 1
+
+        self._aggregates = None
+        self._columns = None
+        self.keep_df = keep_df
+
+        if self.path.suffix == _ColumnStore.suffix:
+            # sloupcové úložiště jen namapuj do paměti
+            self._store = _ColumnStore(self.path)
+            self._next_id = self._store.ids.read()
+            self._columns = self._store.open()
+            self.keep_df = True
+            if self._columns is None:
+                self.valid = False
+                self.errors.append(f"Stats import failed! "
+                                   f"File '{self.path}' does not exist!")
+            else:
+                self._position = len(self._columns["game_id"])
+                # id se připisují vzestupně, poslední je tedy největší
+                if self._position:
+                    self._next_id = max(self._next_id,
+                                        int(self._columns["game_id"][-1]) + 1)
+            self.df = None
+        else:
+            # načti dataframe ze souboru (případně po blocích), bloky validuj
+            # a započítej do průběžných agregátů. Čte se jen do konce zápisů
+            # dokončených při otevření souboru, zámek se při čtení nedrží.
+            self._store = _CsvStore(self.path)
+            self._aggregates = Stats.__new_aggregates()
+            self._next_id = self._store.ids.read()
+            self.df = self.__load(chunksize)
+            if self.aggregates["game_id"].count:
+                self._next_id = max(self._next_id,
+                                    self.aggregates["game_id"].max + 1)
+
+    @staticmethod
+    def __new_aggregates():
+        return {col: RunningStats(binwidth)
+                for col, binwidth in Stats.bin_widths.items()}
 
-        # načti dataframe ze souboru. Pokud se povedlo, validuj dataframe.
-        # Pokud je validní, zpracuj chybné hodnoty.
-        self.df = self.__import_df(self.path)
-        if self.df is not None:
-            self.__validate_df()
-        # if self.valid:
-        #     self.__manage_invalid_values()
-
-    def __import_df(self, path):
-        # Importuje dataframe pokud soubor existuje a má správný formát,
-        # jinak zapíše chybu.
+    @property
+    def aggregates(self):
+        """Slovník průběžných agregátů sloupců (instance RunningStats)."""
+        if self._aggregates is None:
+            self._aggregates = Stats.__new_aggregates()
+            if self._columns is not None:
+                for col, aggregate in self._aggregates.items():
+                    aggregate.update(self._columns[col])
+        return self._aggregates
+
+    def __load(self, chunksize):
+        # Načte a zvaliduje data, vrátí dataframe (nebo None, pokud se
+        # import nepovedl nebo se dataframe nemá uchovávat).
+        # Parsování se měří časovačem "stats.import_df" zvlášť pro otevření
+        # souboru a pro každý blok, při čtení po blocích se totiž bloky
+        # parsují až při iteraci.
+        with timer("stats.import_df"):
+            file = self.__open_csv()
+        if file is None:
+            return None
+
+        kept_chunks = []
+        n_bad_types = n_bad_values = 0
         try:
-            df = pd.read_csv(path)
+            with file:
+                with timer("stats.import_df"):
+                    if chunksize is None:
+                        chunks = iter([pd.read_csv(file)])
+                    else:
+                        chunks = pd.read_csv(file, chunksize=chunksize)
+                while True:
+                    with timer("stats.import_df"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    validated = self.__validate_df(chunk)
+                    if validated is None:
+                        return None
+                    chunk, bad_types, bad_values = validated
+                    n_bad_types += bad_types
+                    n_bad_values += bad_values
+                    count("stats.rows_loaded", len(chunk))
+                    count("stats.rows_removed", bad_types + bad_values)
+
+                    if chunksize is not None:
+                        chunk = chunk.astype(Stats.df_dtypes)
+                    for col, aggregate in self.aggregates.items():
+                        aggregate.update(chunk[col].to_numpy())
+                    if self.keep_df:
+                        kept_chunks.append(chunk)
+        except pd.errors.ParserError:
+            self.valid = False
+            self.errors.append(f"Stats import failed! Bad lines in file!")
+            return None
+
+        if n_bad_types:
+            self.errors.append(f"Warning! Removed {n_bad_types} rows "
+                               f"with wrong data type from global stats")
+        if n_bad_values:
+            self.errors.append(f"Warning! Removed {n_bad_values} rows "
+                               f"with invalid values from global stats")
+
+        if not self.keep_df:
+            return None
+        if len(kept_chunks) == 1:
+            return kept_chunks[0]
+        return pd.concat(kept_chunks) if kept_chunks else pd.DataFrame(
+            {col: pd.Series(dtype=dtype)
+             for col, dtype in Stats.df_dtypes.items()})
+
+    def __open_csv(self):
+        # Otevře csv soubor ke čtení (jen zápisy dokončené při otevření, viz
+        # _CsvStore.open) a zapamatuje si pozici konce načítaných dat. Pokud
+        # soubor neexistuje, zapíše chybu a vrátí None.
+        try:
+            file, self._position = self._store.open()
         except FileNotFoundError:
             self.valid = False
             self.errors.append(
-                f"Stats import failed! File '{path}' does not exist!")
-        except pd.errors.ParserError:
+                f"Stats import failed! File '{self.path}' does not exist!")
+            return None
+        return file
+
+    @timed("stats.validate_df")
+    def __validate_df(self, df):
+        # Zvaliduje dataframe (viz _validate_df). Pokud chybí sloupce,
+        # zapíše chybu a vrátí None.
+        missing_columns = _missing_columns(df)
+        if missing_columns:
             self.valid = False
-            self.errors.append(f"Stats import failed! Bad lines in file!")
-        else:
-            return df
-
-    def __validate_df(self):
-        def get_invalid_row_indices(exc: pandera.errors.SchemaErrors, *cases):
-            return exc.failure_cases.loc[exc.failure_cases["check"].isin(cases),
-                                         "index"].unique()
-
-        correct_data_types = DataFrameSchema(
-            {
-                "game_id": Column(int, coerce=True),
-                "n_guesses": Column(int, coerce=True),
-                "time_to_win": Column(float, coerce=True)
-            })
-
-        correct_values = DataFrameSchema(
-            {
-                "game_id": Column(int, Check.greater_than(0), coerce=True),
-                "n_guesses": Column(int, Check.greater_than(0), coerce=True),
-                "time_to_win": Column(float, Check.greater_than(0), coerce=True)
-            })
-
-        for schema in [correct_data_types, correct_values]:
-            try:
-                schema.validate(self.df, lazy=True)
-            except errors.SchemaErrors as e:
-                if "column_in_dataframe" in e.failure_cases.check.values:
-                    missing_columns = ",".join(
-                        e.failure_cases.loc[e.failure_cases["check"] == "column_in_dataframe", "failure_case"])
-                    self.valid = False
-                    self.errors.append(
-                        f"Stats validation Error!"
-                        f" Column(s) '{missing_columns}' are missing!")
-                    return
-                elif schema == correct_data_types:
-                    bad_types = get_invalid_row_indices(e, "coerce_dtype('int64')", "coerce_dtype('float64')")
-                    self.errors.append(
-                                f"Warning! Removed {len(bad_types)} rows "
-                                f"with wrong data type from global stats")
-                elif schema == correct_values:
-                    bad_values = get_invalid_row_indices(e, "greater_than(0)")
-                    self.errors.append(
-                        f"Warning! Removed {len(bad_values)} rows "
-                        f"with invalid values from global stats")
-                self.df = e.data.drop(e.failure_cases["index"])
-
-        self.df = self.df[list(Stats.df_columns)]
+            self.errors.append(
+                f"Stats validation Error!"
+                f" Column(s) '{','.join(missing_columns)}' are missing!")
+            return None
+        return _validate_df(df)
+
+    @property
+    def df(self):
+        """Dataframe načtených dat včetně nově přidaných her."""
+        if self._df is None and self._columns is not None:
+            # sestav dataframe ze sloupcového úložiště až při prvním použití
+            self._df = pd.DataFrame({col: np.asarray(values) for col, values
+                                     in self._columns.items()})
+        if self._new_rows:
+            new_df = pd.DataFrame(self._new_rows, columns=Stats.df_columns)
+            new_df = new_df.astype(self._df.dtypes.to_dict())
+            self._df = pd.concat([self._df, new_df], ignore_index=True)
+            self._new_rows = []
+        return self._df
 
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._new_rows = []
+
+    @timed("stats.add")
     def add(self, new_stats):
-        """Přidá data do dataframe a zapíše do csv souboru.
+        """Přidá hru do statistik.
+
+        Hry se zapisují do souboru po dávkách velikosti 'batch_size' (viz
+        flush), teprve zapsané hry se započítají do dataframe a agregátů.
+        Hru, kterou by validace při načtení vyřadila (např. nulový čas nebo
+        čas nan z StatsCounter.mark_time), nepřidá a započítá ji do
+        varování v 'errors' (jedno varování s počtem her za druh chyby).
 
         Argumenty:
             new_stats:
-                Instance třídy StatsCounter.
+                Instance třídy StatsCounter nebo záznam GameRecord.
                 Nově zazanmenané herní statistiky."""
 
-        if not isinstance(new_stats, StatsCounter):
+        if isinstance(new_stats, StatsCounter):
+            new_stats = new_stats.record()
+        elif not isinstance(new_stats, GameRecord):
             raise TypeError("'new_stats' must be an instance of class "
-                            "StatsCounter!")
-        self.df = self.df.append(new_stats.df, ignore_index=True)
-        self.df.to_csv(self.path, index=False, header=False)  # , mode="a"
+                            "StatsCounter or GameRecord!")
+        problem = _check_record(new_stats)
+        if problem is not None:
+            self.__reject(problem)
+            return
+        self._unwritten_rows.append(new_stats)
+        if len(self._unwritten_rows) >= self.batch_size:
+            self.flush()
+
+    def __reject(self, problem):
+        # Započítá odmítnutou novou hru. Za každý druh chyby je v 'errors'
+        # jediné varování s počtem odmítnutých her, které se přepisuje, aby
+        # seznam u dlouho běžícího programu (server) nerostl.
+        n_rejected, index = self._rejected.get(problem,
+                                               (0, len(self.errors)))
+        n_rejected += 1
+        message = (f"Warning! Removed {n_rejected} new "
+                   f"{'games' if n_rejected > 1 else 'game'} with {problem} "
+                   f"from global stats")
+        if index < len(self.errors):
+            self.errors[index] = message
+        else:
+            self.errors.append(message)
+        self._rejected[problem] = (n_rejected, index)
+        count("stats.rows_removed")
+
+    def __add_rows(self, rows):
+        # Započítá zapsané řádky (list záznamů) do agregátů a dataframe.
+        # Malé dávky (typicky jedna hra) se do agregátů přičtou po
+        # hodnotách v konstantním čase, větší hromadně po sloupcích.
+        for aggregate, values in zip(self.aggregates.values(), zip(*rows)):
+            if len(values) <= _SMALL_BATCH:
+                for value in values:
+                    aggregate.add(value)
+            else:
+                aggregate.update(np.array(values))
+        self.version += len(rows)
+        if self.keep_df:
+            self._new_rows.extend(rows)
+
+    def __read_tail(self):
+        # Načte hry, které do souboru od poslední známé pozice připsaly
+        # jiné procesy. Před zápisem se volá pod zámkem souboru.
+        n_rows = self.aggregates["game_id"].count
+        tail, self._position = self._store.read_tail(self._position, n_rows)
+        if tail is None or tail.empty:
+            return
+        for col, aggregate in self.aggregates.items():
+            aggregate.update(tail[col].to_numpy())
+        self.version += len(tail)
+        self._next_id = max(self._next_id, int(tail["game_id"].max()) + 1)
+        if self.keep_df:
+            self._new_rows.extend(tail.itertuples(index=False, name=None))
+
+    def __reserve_ids(self, n, sync=False):
+        # Přidělí 'n' po sobě jdoucích id. Volá se pod zámkem souboru.
+        # Soubor id se synchronizuje na disk jen se 'sync', viz _IdFile.write.
+        first_id = max(self._store.ids.read(), self._next_id)
+        self._next_id = first_id + n
+        self._store.ids.write(self._next_id, sync)
+        return range(first_id, self._next_id)
+
+    def reserve_ids(self, n):
+        """Rezervuje 'n' po sobě jdoucích id her, vrátí je jako range.
+
+        Rezervovaná id už nepřidělí žádný proces zapisující do stejného
+        souboru (např. pro hromadné simulace)."""
+        with self._store.lock:
+            return self.__reserve_ids(n, sync=True)
+
+    def refresh(self):
+        """Načte hry, které do souboru mezitím zapsaly jiné procesy."""
+        if isinstance(self._store, _CsvStore):
+            # csv soubor se přepisuje atomicky, čte se bez držení zámku
+            self.__read_tail()
+            return
+        with self._store.lock:
+            self.__read_tail()
+
+    @timed("stats.flush")
+    def flush(self):
+        """Zapíše dosud nezapsané hry na konec souboru.
+
+        Pod zámkem souboru nejdřív načte hry zapsané jinými procesy, pak
+        novým hrám přidělí další volná id a zapíše je jedním zápisem. Na
+        disk se soubor synchronizuje až po uvolnění zámku, skupinově za
+        všechny procesy, které mezitím zapsaly (viz _SyncMark). Metoda se
+        vrátí až po synchronizaci zapsaných her."""
+        if not self._unwritten_rows:
+            return
+        with self._store.lock:
+            self.__read_tail()
+            ids = self.__reserve_ids(len(self._unwritten_rows))
+            rows = [GameRecord(game_id, *row[1:])
+                    for game_id, row in zip(ids, self._unwritten_rows)]
+            self._store.append(dict(zip(Stats.df_columns, zip(*rows))))
+            self._position = self._store.position()
+            synced_position = self._store.sync_position()
+        if self._store.synced.sync(self._store, synced_position):
+            count("stats.fsyncs")
+        self._unwritten_rows = []
+        self.__add_rows(rows)
+        count("stats.rows_written", len(rows))
+
+    def compact(self):
+        """Přepíše soubor aktuálním dataframe.
+
+        Odstraní ze souboru řádky vyřazené při validaci. Jediné místo, kde se
+        soubor přepisuje celý. Vyžaduje celý dataframe (keep_df)."""
+        if not self.keep_df:
+            raise ValueError("Compaction needs the whole dataframe, "
+                             "load stats with 'keep_df=True'!")
+        with self._store.lock:
+            self.refresh()
+            self.flush()
+            self._store.rewrite(self.df)
+            self._position = self._store.position()
+            if self._columns is not None:
+                self._columns = self._store.open()
 
     def __str__(self):
         """Vypíše cestu k csv souboru a dataframe dat."""
@@ -150,59 +797,246 @@ class Stats:
                 f"{self.df}")
 
     def __getitem__(self, col):
-        """Vrátí sloupec 'col' dataframe."""
+        """Vrátí sloupec 'col' dataframe.
+
+        U sloupcového úložiště bez nově přidaných her vrací sloupec přímo
+        nad namapovaným souborem (bez kopírování). Jinak vyžaduje celý
+        dataframe (keep_df)."""
+        if self._df is None and self._columns is not None \
+                and not self._new_rows:
+            return pd.Series(self._columns[col], name=col, copy=False)
+        if not self.keep_df:
+            raise ValueError("Columns need the whole dataframe, "
+                             "load stats with 'keep_df=True'!")
+        if self.df is None:
+            raise ValueError(f"Stats from '{self.path}' are not loaded!")
         return self.df[col]
 
+    def value_counts(self, col):
+        """Vrátí dataframe hodnot sloupce 'col' a jejich počtů.
+
+        Počítá se z histogramu průběžných agregátů (hodnoty zaokrouhlené na
+        šířku třídy, viz bin_widths), bez procházení dat. Výsledek lze
+        předat do ascii_chart.Histogram s parametrem weights="count"."""
+        values, counts = self.aggregates[col].histogram()
+        return pd.DataFrame({col: values, "count": counts})
+
     @property
     def empty(self):
-        """Bool, jestli je dataframe prázdná."""
-        return self.df.empty
+        """Bool, jestli jsou statistiky prázdné."""
+        return self.aggregates["game_id"].count == 0
 
     @property
     def next_id(self):
-        """Integer, další volné id hry."""
-        return self["game_id"].max() + 1 if not self.empty else 1
+        """Integer, další volné id hry.
+
+        Id je předběžné, definitivní id dostane hra při zápisu (flush)."""
+        return self._next_id
+
+
+class RunningStats:
+    """Průběžné agregáty jednoho sloupce statistik.
+
+    Aktualizují se po blocích dat (update) nebo po jednotlivých hodnotách
+    (add, v konstantním čase), takže k nim není potřeba mít v paměti celý
+    sloupec. Histogram slouží zároveň jako náčrt rozdělení pro výpočet
+    kvantilů (přesnost je daná šířkou tříd).
+
+    Atributy:
+        count: počet hodnot
+        total: součet hodnot
+        total_sq: součet druhých mocnin hodnot
+        min, max: nejmenší a největší hodnota (None pokud nejsou data)
+        binwidth: šířka tříd histogramu (None = histogram se nepočítá)
+        bins:
+            slovník {index třídy: počet hodnot}, třída 'i' obsahuje hodnoty
+            zaokrouhlené na i * binwidth
+    """
+
+    def __init__(self, binwidth=None):
+        self.binwidth = binwidth
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.min = None
+        self.max = None
+        self.bins = {}
+
+    def update(self, values):
+        """Započítá pole hodnot."""
+        if not len(values):
+            return
+        self.count += len(values)
+        self.total += values.sum(
+            dtype=np.float64 if values.dtype.kind == "f" else None).item()
+        self.total_sq += np.square(values, dtype=np.float64).sum().item()
+        chunk_min, chunk_max = values.min().item(), values.max().item()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+        if self.binwidth is not None:
+            keys, counts = np.unique(
+                np.rint(values / self.binwidth).astype(np.int64),
+                return_counts=True)
+            for key, n in zip(keys.tolist(), counts.tolist()):
+                self.bins[key] = self.bins.get(key, 0) + n
+
+    def add(self, value):
+        """Započítá jednu hodnotu."""
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        if self.binwidth is not None:
+            key = round(value / self.binwidth)
+            self.bins[key] = self.bins.get(key, 0) + 1
+
+    @property
+    def mean(self):
+        """Průměr hodnot (nan pokud nejsou data)."""
+        return self.total / self.count if self.count else nan
+
+    @property
+    def std(self):
+        """Směrodatná odchylka hodnot (nan pokud nejsou data)."""
+        if not self.count:
+            return nan
+        variance = self.total_sq / self.count - self.mean ** 2
+        return max(variance, 0) ** 0.5
+
+    def quantile(self, q):
+        """Vrátí 'q'-kvantil (0 až 1) odhadnutý z histogramu.
+
+        Vyvolává:
+            ValueError: Histogram se nepočítá (binwidth je None).
+        """
+        if not self.count:
+            return nan
+
+        values, counts = self.histogram()
+        rank = q * (self.count - 1)
+        return values[np.searchsorted(np.cumsum(counts), rank,
+                                      side="right")].item()
+
+    def histogram(self):
+        """Vrátí dvojici polí (hodnoty tříd, četnosti) seřazenou podle hodnot.
+
+        Vyvolává:
+            ValueError: Histogram se nepočítá (binwidth je None).
+        """
+        if self.binwidth is None:
+            raise ValueError("Histogram is not kept, 'binwidth' is None!")
+        keys = np.fromiter(self.bins.keys(), dtype=np.int64,
+                           count=len(self.bins))
+        counts = np.fromiter(self.bins.values(), dtype=np.int64,
+                             count=len(self.bins))
+        order = np.argsort(keys)
+        # dělení převrácenou hodnotou dává přesnější hodnoty než násobení
+        # (např. 6546 / 100 místo 6546 * 0.01)
+        if self.binwidth < 1:
+            values = keys[order] / round(1 / self.binwidth)
+        else:
+            values = keys[order] * self.binwidth
+        return values, counts[order]
+
+
+GameRecord = namedtuple("GameRecord", ["game_id", "n_guesses",
+                                       "time_to_win"])
+GameRecord.__doc__ = """Záznam jedné dohrané hry (řádek statistik)."""
 
 
 class StatsCounter:
-    """ Obal počítadla pomocí slovníku pro hezčí kód.
+    """Počítadlo herních statistik jedné hry.
+
+    Hodnoty jsou v atributech se '__slots__', bez slovníku a bez pandas.
+    Dohraná hra se do statistik předává jako záznam GameRecord (record).
 
     Atributy:
         global_stats: instance třidy Stats statistik minulých her.
-        stats: slovník s počítadlem herních statistik.
+        game_id: předběžné id hry (definitivní dostane při zápisu)
+        n_guesses: počet pokusů
+        time_to_win: čas hry v sekundách
         start_time: čas začátku hry"""
 
+    __slots__ = ("global_stats", "game_id", "n_guesses", "time_to_win",
+                 "start_time")
+
     def __init__(self, global_stats):
         self.global_stats = global_stats
-        game_id = 0 if global_stats is None else global_stats.next_id
-        self.stats = {"game_id": game_id,
-                      "n_guesses": 0,
-                      "time_to_win": 0.0}
+        self.game_id = 0 if global_stats is None else global_stats.next_id
+        self.n_guesses = 0
+        self.time_to_win = 0.0
 
         self.start_time = None
 
     def start_timer(self):
         """Zaznamená aktualní čas."""
-        # noinspection PyAttributeOutsideInit
         self.start_time = time()
 
     def mark_time(self, digits=2):
         """Zazanmená a zapopočítá čas hry."""
         if self.start_time is not None:
-            self.stats["time_to_win"] = round(time() - self.start_time, digits)
+            self.time_to_win = round(time() - self.start_time, digits)
         else:
-            self.stats["time_to_win"] = nan
+            self.time_to_win = nan
 
     def count_guess(self):
         """Započítá hádání."""
-        self.stats["n_guesses"] += 1
+        self.n_guesses += 1
+
+    def record(self):
+        """Vrátí statistiky hry jako záznam GameRecord."""
+        return GameRecord(self.game_id, self.n_guesses, self.time_to_win)
+
+    @property
+    def stats(self):
+        """Statistiky hry jako slovník (kopie)."""
+        return self.record()._asdict()
 
     @property
     def df(self):
         """Počítadlo jako dataframe."""
-        return pd.DataFrame(self.stats, columns=self.global_stats.df.columns,
-                            index=[0])
+        return pd.DataFrame([self.record()], columns=Stats.df_columns)
 
     def __getitem__(self, key):
-        """Vrátí hodnotu vnitřího slovníku podle klíče."""
-        return self.stats[key]
+        """Vrátí hodnotu statistiky podle názvu sloupce."""
+        if key not in GameRecord._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+def csv_to_columns(csv_filename, columns_filename, chunksize=10 ** 6):
+    """Převede csv soubor statistik na sloupcové binární úložiště.
+
+    Csv soubor čte a validuje po blocích, nevalidní řádky vynechá.
+
+    Argumenty:
+        csv_filename: název zdrojového csv souboru v pracovní složce programu
+        columns_filename: název úložiště (s příponou '.cols')
+        chunksize: počet řádků čtených najednou
+
+    Vrací:
+        počet převedených řádků
+
+    Vyvolává:
+        ValueError: ve zdrojovém souboru chybí sloupce.
+    """
+    store = _ColumnStore(_get_path(columns_filename))
+    store.create()
+    n_rows = 0
+    next_id = 1
+    for chunk in pd.read_csv(_get_path(csv_filename), chunksize=chunksize):
+        missing_columns = _missing_columns(chunk)
+        if missing_columns:
+            raise ValueError(f"Column(s) '{','.join(missing_columns)}' "
+                             f"are missing!")
+        chunk, _, _ = _validate_df(chunk)
+        store.append({col: chunk[col].to_numpy() for col in Stats.df_columns})
+        n_rows += len(chunk)
+        if len(chunk):
+            next_id = max(next_id, int(chunk["game_id"].max()) + 1)
+    store.fsync()
+    store.ids.write(next_id, sync=True)
+    return n_rows
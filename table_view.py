@@ -0,0 +1,118 @@
+"""Modul pro stránkované zobrazení tabulky v příkazovém řádku.
+
+Tabulka se nevykresluje celá, ale vždy jen viditelná stránka s pevnou
+šířkou sloupců, takže první stránka se zobrazí okamžitě i u milionů řádků.
+Na řádek lze přeskočit podle hodnoty ve sloupci (např. čísla hry), hledá
+se binárně v seřazeném indexu sloupce.
+
+    Typické použití:
+
+    view = TableView({"id": ids, "value": values}, headers=["ID", "Value"])
+    print(view.render())  # vypsání aktuální stránky
+    view.next_page()
+    view.seek("id", 1234)  # přeskočení na řádek s id 1234
+"""
+
+
+import numpy as np
+
+
+class TableView:
+    """Stránkované zobrazení tabulky s pevnou šířkou sloupců.
+
+    Atributy:
+        columns: slovník {název: sloupec (pole nebo Series)}
+        headers: záhlaví sloupců, mohou obsahovat nové řádky
+        page_size: počet řádků na stránce
+        start: index prvního řádku aktuální stránky
+        widths: šířky sloupců
+    """
+
+    def __init__(self, columns, headers, page_size=20, min_width=10):
+        """Argumenty:
+            columns: slovník {název: sloupec}, sloupce musí být stejně dlouhé
+            headers: záhlaví sloupců (ve stejném pořadí jako columns)
+            page_size: počet řádků na stránce
+            min_width: minimální šířka sloupce
+        """
+        if len(headers) != len(columns):
+            raise ValueError("Number of 'headers' must match 'columns'!")
+        self.columns = columns
+        self.headers = [[line.strip() for line in str(header).split("\n")]
+                        for header in headers]
+        self.page_size = page_size
+        self.start = 0
+        self.widths = [max(min_width, *(len(line) + 2 for line in header))
+                       for header in self.headers]
+
+        # index pro hledání podle hodnoty: {název: (seřazené hodnoty, řádky)}
+        self._indexes = {}
+
+    def __len__(self):
+        """Počet řádků tabulky."""
+        return len(next(iter(self.columns.values()), ()))
+
+    def _render_row(self, cells):
+        # vrátí řádek tabulky, buňky zarovnané doprava
+        return "|" + "|".join(f"{cell} ".rjust(width)
+                              for cell, width in zip(cells, self.widths)) + "|"
+
+    def render(self):
+        """Vrátí aktuální stránku tabulky jako string."""
+        sep = "+" + "+".join("-" * width for width in self.widths) + "+"
+        output = [sep]
+
+        n_header_lines = max(len(header) for header in self.headers)
+        for i in range(n_header_lines):
+            output.append("|" + "|".join(
+                (header[i] if i < len(header) else "").center(width)
+                for header, width in zip(self.headers, self.widths)) + "|")
+        output.append(sep)
+
+        end = min(self.start + self.page_size, len(self))
+        window = [np.asarray(col[self.start:end])
+                  for col in self.columns.values()]
+        for row in zip(*window):
+            output.append(self._render_row(str(value) for value in row))
+        output.append(sep)
+        output.append(f"rows {self.start + 1 if end else 0}-{end} "
+                      f"of {len(self)}")
+
+        return "\n".join(output)
+
+    def next_page(self):
+        """Přejde na další stránku. Vrací False, pokud už žádná není."""
+        if self.start + self.page_size >= len(self):
+            return False
+        self.start += self.page_size
+        return True
+
+    def previous_page(self):
+        """Přejde na předchozí stránku. Vrací False, pokud už žádná není."""
+        if self.start == 0:
+            return False
+        self.start = max(self.start - self.page_size, 0)
+        return True
+
+    def _get_index(self, col):
+        # Vrátí (seřazené hodnoty, pozice řádků) sloupce. Seřazený sloupec
+        # (např. game_id) slouží jako index přímo, jinak se index vytvoří
+        # jednou seřazením a uloží.
+        if col not in self._indexes:
+            values = np.asarray(self.columns[col])
+            if np.all(values[1:] >= values[:-1]):
+                self._indexes[col] = values, None
+            else:
+                order = np.argsort(values, kind="stable")
+                self._indexes[col] = values[order], order
+        return self._indexes[col]
+
+    def seek(self, col, value):
+        """Přejde na stránku začínající řádkem s hodnotou 'value' ve sloupci
+        'col'. Vrací False, pokud taková hodnota neexistuje."""
+        sorted_values, rows = self._get_index(col)
+        position = int(np.searchsorted(sorted_values, value))
+        if position == len(sorted_values) or sorted_values[position] != value:
+            return False
+        self.start = position if rows is None else int(rows[position])
+        return True
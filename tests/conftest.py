@@ -0,0 +1,19 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def fixture_file(tmp_path):
+    """Zkopíruje soubor ze složky 'files' do dočasné složky, vrátí cestu.
+
+    Statistiky se tak načítají z kopie a pomocné soubory (zámek, id) se
+    nevytvářejí ve složce projektu."""
+    def copy(name):
+        return Path(shutil.copy(ROOT / "files" / name, tmp_path / name))
+    return copy
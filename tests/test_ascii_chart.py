@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ascii_chart import BinCounter, Histogram
+
+
+def _random_column(kind, seed):
+    rng = np.random.default_rng(seed)
+    if kind == "int":
+        return pd.Series(rng.integers(1, 40, 1000), name="x")
+    return pd.Series(np.round(rng.uniform(0.5, 900, 1000), 2), name="x")
+
+
+@pytest.mark.parametrize("kind", ["int", "float"])
+@pytest.mark.parametrize("precision", [0, -1, 3])
+@pytest.mark.parametrize("n", [1, 7, 10])
+def test_histogram_matches_pd_cut(kind, precision, n):
+    col = _random_column(kind, seed=n)
+    chart_data = Histogram(pd.DataFrame({"x": col}), "x", n=n,
+                           precision=precision)._get_chart_data()
+    expected = pd.cut(col, n, precision=precision).value_counts()
+
+    chart_data, expected = chart_data.sort_index(), expected.sort_index()
+    assert chart_data.index.equals(pd.IntervalIndex(expected.index))
+    assert chart_data.tolist() == expected.tolist()
+
+
+def test_histogram_from_counts_matches_raw():
+    col = _random_column("int", seed=0)
+    counts = col.value_counts()
+    from_counts = Histogram(
+        pd.DataFrame({"x": counts.index, "count": counts.to_numpy()}), "x",
+        weights="count", precision=0)._get_chart_data()
+    raw = Histogram(pd.DataFrame({"x": col}), "x",
+                    precision=0)._get_chart_data()
+
+    assert from_counts.equals(raw)
+
+
+def test_bin_counter_chunks_and_single_values():
+    values = _random_column("float", seed=1).to_numpy()
+    whole = BinCounter(values.min(), values.max(), 10)
+    whole.update(values)
+    chunked = BinCounter(values.min(), values.max(), 10)
+    for chunk in np.array_split(values, 7):
+        chunked.update(chunk)
+    single = BinCounter(values.min(), values.max(), 10)
+    for value in values:
+        single.add(value)
+
+    assert whole.counts.sum() == len(values) and whole.outside == 0
+    np.testing.assert_array_equal(chunked.counts, whole.counts)
+    np.testing.assert_array_equal(single.counts, whole.counts)
+
+
+def test_histogram_of_empty_data_has_no_bins():
+    chart = Histogram(data=pd.DataFrame({"x": [], "count": []}), x="x",
+                      weights="count", precision=0)
+
+    assert chart.chart_data.empty
+    with pytest.raises(ValueError, match="No data"):
+        chart.render()
+
+
+def test_chart_of_empty_stats_prints_message(tmp_path, monkeypatch, capsys):
+    import main
+    from stats import Stats
+
+    path = tmp_path / "stats.csv"
+    path.write_text("game_id,n_guesses,time_to_win\n")
+    monkeypatch.setattr(main, "global_stats", Stats(path))
+    monkeypatch.setattr("builtins.input", lambda prompt="": "")
+    main.n_guesses_chart()
+
+    assert capsys.readouterr().out == "No games played yet!\n"
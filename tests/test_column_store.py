@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats import GameRecord, Stats, csv_to_columns
+
+
+@pytest.fixture
+def cols_path(fixture_file):
+    csv_path = fixture_file("bad_stats_fixed.csv")
+    path = csv_path.with_suffix(".cols")
+    csv_to_columns(csv_path, path)
+    return path
+
+
+def _rows(path):
+    stats = Stats(path)
+    return stats.df.to_numpy().tolist()
+
+
+def _cut(path, col, n_bytes):
+    # useknutí konce souboru sloupce (přerušený zápis)
+    column_path = path / f"{col}.bin"
+    column_path.write_bytes(column_path.read_bytes()[:-n_bytes])
+
+
+def test_conversion_keeps_rows(fixture_file, cols_path):
+    expected = pd.read_csv(fixture_file("bad_stats_fixed.csv"))
+
+    np.testing.assert_allclose(Stats(cols_path).df.to_numpy(),
+                               expected.to_numpy(), rtol=1e-6)
+
+
+@pytest.mark.parametrize("col, n_bytes", [("time_to_win", 2),
+                                          ("n_guesses", 4),
+                                          ("game_id", 6)])
+def test_append_realigns_torn_columns(cols_path, col, n_bytes):
+    rows = _rows(cols_path)
+    _cut(cols_path, col, n_bytes)
+
+    # neúplný poslední řádek se při načtení ignoruje
+    n_complete = len(rows) - (n_bytes + 3) // 4
+    assert _rows(cols_path) == rows[:n_complete]
+
+    stats = Stats(cols_path, batch_size=1)
+    stats.add(GameRecord(0, 3, 7.5))
+
+    reloaded = _rows(cols_path)
+    assert reloaded[:n_complete] == rows[:n_complete]
+    assert len(reloaded) == n_complete + 1
+    assert reloaded[-1][1:] == [3, 7.5]
+    assert reloaded[-1][0] > max(row[0] for row in rows)
+    sizes = {(cols_path / f"{name}.bin").stat().st_size
+             for name in Stats.df_columns}
+    assert sizes == {(n_complete + 1) * 4}
+
+
+def test_compact_rewrites_store(cols_path):
+    rows = _rows(cols_path)
+    # zbytky přerušeného přepsání se uklidí
+    old_path = cols_path.with_name(cols_path.name + ".old")
+    old_path.mkdir()
+    (old_path / "game_id.bin").write_bytes(b"stale")
+
+    stats = Stats(cols_path, batch_size=10)
+    stats.add(GameRecord(0, 3, 7.5))
+    stats.compact()
+
+    assert not old_path.exists()
+    assert not cols_path.with_name(cols_path.name + ".tmp").exists()
+    reloaded = _rows(cols_path)
+    assert reloaded[:-1] == rows
+    assert reloaded[-1][1:] == [3, 7.5]
+    # po přepsání lze dál připisovat
+    stats.add(GameRecord(0, 4, 9.5))
+    stats.flush()
+    assert _rows(cols_path)[-1][1:] == [4, 9.5]
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute() / "benchmarks"))
+
+from concurrent_writers import run  # noqa: E402
+
+
+@pytest.mark.parametrize("columns", [False, True])
+@pytest.mark.parametrize("batch_size", [1, 7])
+def test_no_games_lost(columns, batch_size):
+    # run sám zkontroluje, že mají hry id 1..N bez mezer a duplicit
+    _, stats = run(n_writers=8, n_games=40, batch_size=batch_size,
+                   columns=columns)
+
+    assert stats.aggregates["game_id"].count == 8 * 40
+    assert stats.errors == []
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from game import _check_guess, secret_space
+from score_table import N_SECRETS, build_table, decode, index_of, number_of
+
+
+def _reference_table(chunk_size=256):
+    # Tabulka odpovědí počítaná přímo porovnáním cifer (bez kódování čísel).
+    # Cifry se neopakují, společné cifry jsou tedy počet shodných dvojic
+    # cifer na libovolných pozicích.
+    space = secret_space()
+    table = np.empty((N_SECRETS, N_SECRETS), dtype=np.uint8)
+    for start in range(0, N_SECRETS, chunk_size):
+        guesses = space[start:start + chunk_size]
+        equal = guesses[:, None, :, None] == space[None, :, None, :]
+        bulls = np.trace(equal, axis1=2, axis2=3)
+        common = equal.sum(axis=(2, 3))
+        table[start:start + chunk_size] = 5 * bulls + (common - bulls)
+    return table
+
+
+def test_build_table_is_byte_identical(tmp_path):
+    path = tmp_path / "score_table.bin"
+    build_table(path)
+
+    assert path.read_bytes() == _reference_table().tobytes()
+
+
+def test_table_matches_check_guess(tmp_path):
+    path = tmp_path / "score_table.bin"
+    build_table(path)
+    table = np.fromfile(path, dtype=np.uint8).reshape(N_SECRETS, N_SECRETS)
+    rng = np.random.default_rng(0)
+    for guess, secret in rng.integers(N_SECRETS, size=(500, 2)):
+        verdict = _check_guess(number_of(guess), number_of(secret))
+        assert decode(table[guess, secret]) == tuple(verdict)
+
+
+@pytest.mark.parametrize("number", ["12345", "123", "", "12a4", "-123",
+                                    "0123", "1123"])
+def test_index_of_rejects_invalid_numbers(number):
+    with pytest.raises(ValueError, match="not a valid secret number"):
+        index_of(number)
+
+
+def test_index_of_round_trip():
+    assert index_of(number_of(0)) == 0
+    assert index_of(list("9876")) == N_SECRETS - 1
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from server import GameServer
+from stats import GameRecord, Stats
+
+
+class _SlowStats(Stats):
+    # Statistiky s pomalým zápisem, které hlídají souběžné volání flush.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flush_started = threading.Event()
+        self.overlapped = False
+        self._flushing = threading.Lock()
+
+    def flush(self):
+        if not self._flushing.acquire(blocking=False):
+            self.overlapped = True
+            return
+        try:
+            if self._unwritten_rows:
+                self.flush_started.set()
+                time.sleep(0.2)
+            super().flush()
+        finally:
+            self._flushing.release()
+
+
+def test_shutdown_waits_for_running_flush(fixture_file, capsys):
+    path = fixture_file("bad_stats_fixed.csv")
+    n_rows = len(Stats(path).df)
+    stats = _SlowStats(path, batch_size=float("inf"))
+    games = [GameRecord(0, n_guesses, n_guesses * 2.5)
+             for n_guesses in range(1, 6)]
+
+    async def scenario():
+        server = GameServer(stats, max_batch=2)
+        serve = asyncio.create_task(server.serve(port=0))
+        for game in games[:2]:
+            server._finished_games.put_nowait(game)
+        while not stats.flush_started.is_set():
+            await asyncio.sleep(0.01)
+        # hry, které přijdou během zápisu, zůstanou ve frontě
+        for game in games[2:]:
+            server._finished_games.put_nowait(game)
+        serve.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await serve
+
+    asyncio.run(scenario())
+
+    assert not stats.overlapped
+    reloaded = Stats(path)
+    assert len(reloaded.df) == n_rows + len(games)
+    assert sorted(reloaded.df["n_guesses"].tolist()[n_rows:]) == \
+        [1, 2, 3, 4, 5]
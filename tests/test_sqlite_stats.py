@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from sqlite_stats import SqliteStats
+from stats import GameRecord
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "stats.sqlite"
+
+
+def _game_ids(stats):
+    return stats["game_id"].tolist()
+
+
+def test_add_rejects_invalid_game(db_path):
+    stats = SqliteStats(db_path)
+    stats.add(GameRecord(0, 5, 0.0))
+
+    assert stats.errors == ["Warning! Removed 1 new game with invalid "
+                            "values from global stats"]
+    assert stats.empty
+
+
+def test_flush_drops_batch_rejected_by_database(db_path):
+    stats = SqliteStats(db_path, batch_size=10)
+    stats.add(GameRecord(0, 5, 12.5))
+    # řádek, který by add odmítl, zapíše až databáze (CHECK omezení)
+    stats._unwritten_rows.append(GameRecord(0, 5, -1.0))
+    stats.flush()
+
+    assert len(stats.errors) == 1
+    assert stats.errors[0].startswith("Warning! Removed 2 new game(s) "
+                                      "rejected by the database")
+    assert stats.empty
+    # odmítnutá dávka se znovu nezkouší
+    stats.add(GameRecord(0, 7, 20.0))
+    stats.flush()
+    assert len(stats.errors) == 1
+    assert stats["n_guesses"].tolist() == [7]
+
+
+def test_flush_requeues_rows_when_database_is_locked(db_path):
+    stats = SqliteStats(db_path)
+    stats._query("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            stats.add(GameRecord(0, 5, 12.5))
+        assert len(stats._unwritten_rows) == 1
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+    stats.flush()
+    assert stats._unwritten_rows == []
+    assert _game_ids(stats) == [1]
+    assert stats.errors == []
+
+
+def test_reserve_ids_are_contiguous_across_connections(db_path):
+    first = SqliteStats(db_path)
+    second = SqliteStats(db_path)
+
+    reserved = first.reserve_ids(5)
+    assert reserved == range(1, 6)
+    assert second.reserve_ids(3) == range(6, 9)
+    # rezervovaná id se hrám nepřidělí
+    first.add(GameRecord(0, 5, 12.5))
+    assert _game_ids(second) == [9]
+    assert second.next_id == 10
+
+
+def test_refresh_follows_other_connection(db_path):
+    reader = SqliteStats(db_path)
+    writer = SqliteStats(db_path)
+    assert reader.aggregates["n_guesses"].count == 0
+    version = reader.version
+
+    writer.add(GameRecord(0, 4, 10.0))
+    writer.add(GameRecord(0, 6, 30.0))
+
+    aggregate = reader.aggregates["n_guesses"]
+    assert reader.version > version
+    assert (aggregate.count, aggregate.min, aggregate.max) == (2, 4, 6)
+    assert reader.aggregates["time_to_win"].mean == pytest.approx(20.0)
+    # beze změny dat refresh agregáty nezneplatní
+    assert reader.aggregates["n_guesses"] is aggregate
+
+
+def test_compact_flushes_and_truncates_wal(db_path):
+    stats = SqliteStats(db_path, batch_size=10)
+    for n_guesses in range(1, 6):
+        stats.add(GameRecord(0, n_guesses, n_guesses * 2.0))
+    assert stats.empty
+
+    stats.compact()
+
+    assert stats._unwritten_rows == []
+    assert _game_ids(stats) == [1, 2, 3, 4, 5]
+    wal_path = db_path.with_name(db_path.name + "-wal")
+    assert not wal_path.exists() or wal_path.stat().st_size == 0
+    stats.close()
+    assert SqliteStats(db_path)["n_guesses"].tolist() == [1, 2, 3, 4, 5]
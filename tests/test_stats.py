@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats import GameRecord, Stats, _CsvStore, _validate_df
+
+
+# Výsledky původní validace pomocí pandera pro files/bad_stats.csv:
+# řádky se špatným typem se vyřadí první, ze zbylých řádky se zápornou
+# hodnotou. Ponechané řádky odpovídají files/bad_stats_fixed.csv.
+BAD_TYPE_ROWS = [2, 8, 11, 13]
+BAD_VALUE_ROWS = [1, 3, 6]
+KEPT_ROWS = [0, 4, 5, 7, 9, 10, 12, 14]
+WARNINGS = ["Warning! Removed 4 rows with wrong data type from global stats",
+            "Warning! Removed 3 rows with invalid values from global stats"]
+
+
+def test_validate_df_matches_pandera(fixture_file):
+    df = pd.read_csv(fixture_file("bad_stats.csv"))
+    validated, n_bad_types, n_bad_values = _validate_df(df)
+
+    assert n_bad_types == len(BAD_TYPE_ROWS)
+    assert n_bad_values == len(BAD_VALUE_ROWS)
+    assert validated.index.tolist() == KEPT_ROWS
+    assert validated.dtypes.to_dict() == {"game_id": np.int64,
+                                          "n_guesses": np.int64,
+                                          "time_to_win": np.float64}
+
+
+@pytest.mark.parametrize("chunksize", [None, 4])
+def test_stats_load_matches_pandera(fixture_file, chunksize):
+    stats = Stats(fixture_file("bad_stats.csv"), chunksize=chunksize)
+    expected = pd.read_csv(fixture_file("bad_stats_fixed.csv"))
+
+    assert stats.valid
+    assert stats.errors == WARNINGS
+    assert stats.df.index.tolist() == KEPT_ROWS
+    # po blocích se načítají úsporné typy (float32)
+    np.testing.assert_allclose(stats.df.to_numpy(), expected.to_numpy(),
+                               rtol=1e-6)
+
+
+def test_stats_missing_column(fixture_file):
+    stats = Stats(fixture_file("bad_cols.csv"))
+
+    assert not stats.valid
+    assert stats.errors == ["Stats validation Error! "
+                            "Column(s) 'time_to_win' are missing!"]
+
+
+def test_stats_column_without_dataframe(fixture_file):
+    stats = Stats(fixture_file("bad_stats_fixed.csv"), keep_df=False)
+
+    with pytest.raises(ValueError, match="keep_df=True"):
+        stats["n_guesses"]
+
+
+def test_stats_load_does_not_create_lock(fixture_file):
+    path = fixture_file("bad_stats_fixed.csv")
+    lock_path = path.with_name(path.name + ".lock")
+    stats = Stats(path, batch_size=1)
+    stats.refresh()
+    assert not lock_path.exists()
+
+    stats.add(GameRecord(0, 5, 12.5))
+    assert lock_path.exists()
+
+
+def test_stats_load_reads_only_completed_writes(fixture_file):
+    path = fixture_file("bad_stats_fixed.csv")
+    size = path.stat().st_size
+    file, position = _CsvStore(path).open()
+    with file, open(path, "a") as other:
+        other.write("\n100,5,12.5\n")
+        other.flush()
+        df = pd.read_csv(file)
+
+    assert position[1] == size
+    assert len(df) == len(KEPT_ROWS)
+
+
+def test_sync_mark_past_truncated_file_is_stale(fixture_file, monkeypatch):
+    # soubor zkrácený na původní velikost (jako v benchmarks/suite.py)
+    # nesmí převzít značku synchronizace z předchozího běhu
+    path = fixture_file("bad_stats_fixed.csv")
+    size = path.stat().st_size
+    fsyncs = []
+    monkeypatch.setattr(_CsvStore, "fsync",
+                        lambda store: fsyncs.append(store.position()))
+
+    for _ in range(2):
+        stats = Stats(path, batch_size=1, keep_df=False)
+        for _ in range(3):
+            stats.add(GameRecord(0, 5, 12.5))
+        with open(path, "r+b") as file:
+            file.truncate(size)
+
+    assert len(fsyncs) == 6
+
+
+@pytest.mark.parametrize("batch_size", [1, 40])
+def test_aggregates_after_add_match_reload(fixture_file, batch_size):
+    # malé dávky se do agregátů přičítají po hodnotách, velké hromadně
+    path = fixture_file("bad_stats_fixed.csv")
+    stats = Stats(path, batch_size=batch_size)
+    for n_guesses in range(1, 41):
+        stats.add(GameRecord(0, n_guesses, n_guesses * 1.25))
+    reloaded = Stats(path)
+
+    for col, aggregate in stats.aggregates.items():
+        expected = reloaded.aggregates[col]
+        assert (aggregate.count, aggregate.min, aggregate.max) == \
+            (expected.count, expected.min, expected.max)
+        assert aggregate.total == pytest.approx(expected.total)
+        assert aggregate.bins == expected.bins
+
+
+def test_rejected_games_share_one_warning(fixture_file):
+    stats = Stats(fixture_file("bad_stats_fixed.csv"))
+    n_errors = len(stats.errors)
+    for _ in range(3):
+        stats.add(GameRecord(0, 5, 0.0))
+    stats.add(GameRecord(0, 5, np.nan))
+
+    assert stats.errors[n_errors:] == [
+        "Warning! Removed 3 new games with invalid values from global stats",
+        "Warning! Removed 1 new game with wrong data type from global stats"]
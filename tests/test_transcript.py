@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from game import Verdict, _check_guess
+from transcript import (MAGIC, RECORD_DTYPE, TranscriptWriter,
+                        find_inconsistent, position_difficulty, replay)
+
+
+# Hry jako (tajné číslo, pokusy). V první hře pokus 5123 odporuje verdiktu
+# (0, 0) pokusu 5678 (5 nemůže být v tajném čísle), je to záznam číslo 2.
+GAMES = [("1234", ["5678", "5123", "1234"]),
+         ("9876", ["9867", "9876"])]
+INCONSISTENT = [2]
+
+
+def _write_games(path, games):
+    with TranscriptWriter(path) as transcript:
+        for secret_num, guesses in games:
+            transcript.start_game(secret_num)
+            for guess in guesses:
+                transcript.record(guess, _check_guess(guess, secret_num))
+
+
+def _replayed(path, chunk_size=10 ** 6):
+    return [(game.secret_num, [(guess, verdict)
+                               for guess, verdict, _ in game.guesses])
+            for game in replay(path, chunk_size)]
+
+
+def _expected(games):
+    return [(secret_num, [(guess, _check_guess(guess, secret_num))
+                          for guess in guesses])
+            for secret_num, guesses in games]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 10 ** 6])
+def test_replay_returns_recorded_games(tmp_path, chunk_size):
+    path = tmp_path / "transcript.bin"
+    _write_games(path, GAMES)
+
+    assert path.read_bytes()[:len(MAGIC)] == MAGIC
+    assert _replayed(path, chunk_size) == _expected(GAMES)
+    assert _expected(GAMES)[0][1][-1][1] == Verdict(4, 0)
+
+
+def test_torn_record_is_dropped_on_next_flush(tmp_path):
+    path = tmp_path / "transcript.bin"
+    _write_games(path, GAMES[:1])
+    # přerušený zápis: useknutý záznam na konci souboru
+    with open(path, "ab") as file:
+        file.write(b"\x01\x02\x03\x04")
+
+    # čtení useknutý záznam vynechá, další zápis ho zahodí
+    assert _replayed(path) == _expected(GAMES[:1])
+    _write_games(path, GAMES[1:])
+
+    size = path.stat().st_size - len(MAGIC)
+    assert size % RECORD_DTYPE.itemsize == 0
+    assert _replayed(path) == _expected(GAMES)
+
+
+@pytest.mark.parametrize("header", [b"", MAGIC[:3]])
+def test_torn_header_is_reinitialised(tmp_path, header):
+    path = tmp_path / "transcript.bin"
+    path.write_bytes(header)
+    _write_games(path, GAMES)
+
+    assert _replayed(path) == _expected(GAMES)
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "transcript.bin"
+    path.write_bytes(b"not a transcript")
+    transcript = TranscriptWriter(path)
+    transcript.start_game("1234")
+
+    with pytest.raises(ValueError, match="not a game transcript"):
+        transcript.flush()
+    assert path.read_bytes() == b"not a transcript"
+    with pytest.raises(ValueError, match="not a game transcript"):
+        list(replay(path))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 10 ** 6])
+def test_find_inconsistent(tmp_path, chunk_size):
+    path = tmp_path / "transcript.bin"
+    _write_games(path, GAMES)
+
+    found = np.concatenate(list(find_inconsistent(path, chunk_size)))
+    assert found.tolist() == INCONSISTENT
+
+
+def test_position_difficulty(tmp_path):
+    path = tmp_path / "transcript.bin"
+    _write_games(path, GAMES)
+
+    # podíl pokusů, které cifru na pozici neuhodly (bez bull)
+    guesses = [(guess, secret_num) for secret_num, game_guesses in GAMES
+               for guess in game_guesses]
+    expected = [np.mean([guess[position] != secret_num[position]
+                         for guess, secret_num in guesses])
+                for position in range(4)]
+    np.testing.assert_allclose(position_difficulty(path), expected)
+
+
+def test_position_difficulty_without_guesses(tmp_path):
+    path = tmp_path / "transcript.bin"
+    _write_games(path, [("1234", [])])
+
+    assert np.isnan(position_difficulty(path)).all()
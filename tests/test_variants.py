@@ -0,0 +1,111 @@
+from collections import Counter
+from itertools import product
+
+import numpy as np
+import pytest
+
+from game import _check_guess
+from score_table import encode, index_of, number_of
+from solver import Solver
+from variants import SYMBOLS, Variant
+
+
+VARIANTS = [(4, 10, False, False), (3, 6, True, False), (3, 6, True, True),
+            (4, 8, False, True), (2, 16, True, True), (5, 5, False, True),
+            (6, 3, True, False)]
+
+
+def _brute_force_space(length, base, repeats, leading_zero):
+    # všechna platná tajná čísla v lexikografickém pořadí
+    return ["".join(number)
+            for number in product(SYMBOLS[:base], repeat=length)
+            if (repeats or len(set(number)) == length)
+            and (leading_zero or number[0] != "0")]
+
+
+def _brute_force_score(guess, secret):
+    bulls = sum(g == s for g, s in zip(guess, secret))
+    common = sum((Counter(guess) & Counter(secret)).values())
+    return bulls, common - bulls
+
+
+@pytest.fixture(params=VARIANTS, ids=lambda params: "-".join(map(str, params)))
+def variant_space(request):
+    return Variant(*request.param), _brute_force_space(*request.param)
+
+
+def test_enumerate_and_unrank(variant_space):
+    variant, space = variant_space
+    numbers = [variant.unpack(packed)
+               for chunk in variant.enumerate(chunk_size=100)
+               for packed in chunk.tolist()]
+
+    assert variant.size == len(space)
+    assert numbers == space
+    assert variant.unpack(variant.unrank(len(space) - 1)) == space[-1]
+
+
+def test_validate(variant_space):
+    variant, space = variant_space
+    assert all(variant.validate(number) == () for number in space[::7])
+    invalid = {number for number in _brute_force_space(
+        variant.length, variant.base, True, True)} - set(space)
+    assert all(variant.validate(number) != () for number in invalid)
+
+
+def test_score(variant_space):
+    variant, space = variant_space
+    rng = np.random.default_rng(0)
+    guesses = [space[i] for i in rng.integers(len(space), size=30)]
+    secrets = [space[i] for i in rng.integers(len(space), size=300)]
+    bulls, cows = variant.score_packed([variant.pack(g) for g in guesses],
+                                       [variant.pack(s) for s in secrets])
+
+    for i, guess in enumerate(guesses):
+        for j, secret in enumerate(secrets):
+            assert (bulls[i, j], cows[i, j]) == \
+                _brute_force_score(guess, secret)
+
+
+def test_candidates(variant_space):
+    variant, space = variant_space
+    rng = np.random.default_rng(1)
+    secret = space[rng.integers(len(space))]
+    history = []
+    for guess in (space[i] for i in rng.integers(len(space), size=3)):
+        history.append((variant.pack(guess), _brute_force_score(guess,
+                                                                secret)))
+        expected = [number for number in space
+                    if all(_brute_force_score(variant.unpack(packed), number)
+                           == tuple(verdict) for packed, verdict in history)]
+        found = [variant.unpack(packed)
+                 for chunk in variant.candidates(history, chunk_size=64)
+                 for packed in chunk.tolist()]
+        assert found == expected
+        assert secret in found
+
+
+def test_classic_variant_matches_game():
+    variant = Variant()
+    rng = np.random.default_rng(2)
+    space = _brute_force_space(4, 10, False, False)
+    for guess, secret in rng.integers(len(space), size=(500, 2)):
+        guess, secret = space[guess], space[secret]
+        assert variant.score(variant.pack(guess), variant.pack(secret)) == \
+            _check_guess(guess, secret)
+
+
+def test_classic_candidates_match_solver():
+    variant = Variant()
+    solver = Solver("minimax")
+    secret = "5917"
+    guesses = solver.solve(secret)
+    solver.reset()
+    history = []
+    for guess in guesses[:-1]:
+        verdict = _check_guess(guess, secret)
+        history.append((variant.pack(guess), verdict))
+        solver.update(index_of(guess), encode(*verdict))
+        found = [variant.unpack(packed) for chunk in variant.candidates(history)
+                 for packed in chunk.tolist()]
+        assert found == [number_of(index) for index in solver.candidates]
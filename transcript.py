@@ -0,0 +1,302 @@
+"""Modul pro záznam průběhu her do binárního souboru (transcript).
+
+Do souboru se připisuje každý validní pokus jako záznam pevné délky
+(9 bytů): zakódovaný pokus (game.pack_number), bajt verdiktu (bulls v horních
+4 bitech, cows v dolních) a počet milisekund od předchozího záznamu hry.
+Každou hru uvozuje značka začátku hry: záznam s tajným číslem místo pokusu,
+verdiktem GAME_START a unixovým časem začátku hry (v sekundách) místo
+odstupu. Soubor začíná hlavičkou MAGIC.
+
+Záznamy se čtou po blocích celých her přes np.memmap, takže lze procházet
+i stovky milionů pokusů bez načtení celého souboru do paměti. Analýzy
+(position_difficulty, find_inconsistent) jsou vektorové nad celými bloky.
+
+    Typické použití:
+
+    with TranscriptWriter("game_transcript.bin") as transcript:
+        game = BullsAndCows(transcript=transcript)
+        game.play()
+
+    position_difficulty("game_transcript.bin")  # podíl neuhodnutých pozic
+    for indices in find_inconsistent("game_transcript.bin"):
+        ...  # čísla záznamů pokusů, které odporují dřívějším verdiktům
+    for game in replay("game_transcript.bin"):
+        ...  # TranscriptGame(secret_num, start_time, guesses)
+
+    nebo z příkazové řádky:
+
+    python transcript.py game_transcript.bin
+"""
+
+
+import argparse
+import os
+import struct
+from collections import namedtuple
+from time import monotonic_ns, time
+
+import numpy as np
+
+from game import (Verdict, _DIGITS, _MASK_SHIFT, _POPCOUNT, _SHIFTS,
+                  _ZERO_NIBBLES, pack_number, unpack_number)
+from locking import FileLock
+from stats import _get_path, _sidecar_path
+
+
+MAGIC = b"BCTRANS1"
+RECORD_DTYPE = np.dtype([("guess", "<u4"), ("verdict", "u1"),
+                         ("delta_ms", "<u4")])
+# hodnota verdiktu značky začátku hry (platný verdikt má cows nejvýš 4)
+GAME_START = 0xFF
+
+_RECORD = struct.Struct("<IBI")
+_MAX_DELTA_MS = 0xFFFFFFFF
+
+TranscriptGame = namedtuple("TranscriptGame",
+                            ["secret_num", "start_time", "guesses"])
+
+
+class TranscriptWriter:
+    """Zapisovač průběhu her do binárního souboru.
+
+    Záznamy hry se hromadí v paměti a do souboru se připíší najednou (pod
+    zámkem a se synchronizací na disk) metodou flush, typicky na konci hry.
+    Do jednoho souboru tak může zapisovat více procesů.
+
+    Atributy:
+        path: absolutní cesta k souboru
+    """
+
+    def __init__(self, filename):
+        """Argumenty:
+            filename:
+                Název souboru (pokud neexistuje, vytvoří se). Soubor musí
+                být v pracovní složce programu.
+        """
+        self.path = _get_path(filename)
+        self._lock = FileLock(_sidecar_path(self.path, ".lock"))
+        self._buffer = bytearray()
+        self._last_ns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def start_game(self, secret_num):
+        """Zaznamená začátek hry s tajným číslem 'secret_num' (string)."""
+        self._buffer += _RECORD.pack(pack_number(secret_num), GAME_START,
+                                     int(time()))
+        self._last_ns = monotonic_ns()
+
+    def record(self, guess, verdict):
+        """Zaznamená validní pokus 'guess' (string) a jeho Verdict."""
+        if self._last_ns is None:
+            raise RuntimeError("No game started!")
+        now = monotonic_ns()
+        delta_ms = min((now - self._last_ns) // 10 ** 6, _MAX_DELTA_MS)
+        self._last_ns = now
+        self._buffer += _RECORD.pack(pack_number(guess),
+                                     verdict.bulls << 4 | verdict.cows,
+                                     delta_ms)
+
+    def flush(self):
+        """Připíše nezapsané záznamy na konec souboru.
+
+        Vyvolává:
+            ValueError: soubor existuje, ale nezačíná hlavičkou MAGIC.
+        """
+        if not self._buffer:
+            return
+        with self._lock, open(self.path, "a+b") as file:
+            size = file.seek(0, os.SEEK_END)
+            file.seek(0)
+            header = file.read(len(MAGIC))
+            if len(header) < len(MAGIC) and MAGIC.startswith(header):
+                # prázdný soubor nebo useknutá hlavička (přerušený první
+                # zápis), založ soubor znovu
+                file.truncate(0)
+                file.write(MAGIC)
+            elif header != MAGIC:
+                raise ValueError(
+                    f"File '{self.path}' is not a game transcript!")
+            else:
+                # useknutý poslední záznam (přerušený zápis) zahoď, jinak by
+                # se posunuly všechny další záznamy
+                partial = (size - len(MAGIC)) % RECORD_DTYPE.itemsize
+                if partial:
+                    file.truncate(size - partial)
+            file.write(self._buffer)
+            file.flush()
+            os.fsync(file.fileno())
+        self._buffer.clear()
+
+
+def _open_records(filename):
+    # Namapuje záznamy souboru do paměti (pole RECORD_DTYPE), neúplný
+    # poslední záznam vynechá.
+    path = _get_path(filename)
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"File '{path}' is not a game transcript!")
+    n_records = ((path.stat().st_size - len(MAGIC))
+                 // RECORD_DTYPE.itemsize)
+    if n_records == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                     offset=len(MAGIC), shape=(n_records,))
+
+
+def read_chunks(filename, chunk_size=10 ** 6):
+    """Prochází soubor po blocích celých her.
+
+    Blok má přibližně 'chunk_size' záznamů, začíná značkou začátku hry
+    a hra nikdy nepřesahuje do dalšího bloku. Záznamy před první značkou
+    (poškozený začátek souboru) se vynechají.
+
+    Vrací:
+        generátor dvojic (číslo prvního záznamu bloku, pole záznamů
+        RECORD_DTYPE nad namapovaným souborem)
+    """
+    records = _open_records(filename)
+    n_records = len(records)
+    starts = np.flatnonzero(records["verdict"][:chunk_size] == GAME_START)
+    start = int(starts[0]) if len(starts) else n_records
+    while start < n_records:
+        end = start + chunk_size
+        if end < n_records:
+            # konec bloku posuň na začátek poslední hry, která se do bloku
+            # celá nevejde (hra delší než blok se přidá celá)
+            starts = np.flatnonzero(
+                records["verdict"][start + 1:end + 1] == GAME_START)
+            while not len(starts) and end < n_records:
+                end += chunk_size
+                starts = np.flatnonzero(
+                    records["verdict"][start + 1:end + 1] == GAME_START)
+            if len(starts):
+                end = start + 1 + int(starts[-1])
+        end = min(end, n_records)
+        yield start, records[start:end]
+        start = end
+
+
+def _game_index(records):
+    # vrátí (bool pole značek začátku hry, index značky hry každého záznamu)
+    is_start = records["verdict"] == GAME_START
+    positions = np.where(is_start, np.arange(len(records)), 0)
+    return is_start, np.maximum.accumulate(positions)
+
+
+def _verdict_bytes(guesses, secrets):
+    # bajty verdiktů dvojic zakódovaných čísel (po prvcích), viz
+    # game._check_packed
+    bulls = _ZERO_NIBBLES[(guesses ^ secrets) & _DIGITS]
+    common = _POPCOUNT[(guesses & secrets) >> _MASK_SHIFT]
+    return bulls << 4 | (common - bulls)
+
+
+def position_difficulty(filename, chunk_size=10 ** 6):
+    """Spočítá obtížnost jednotlivých pozic tajného čísla.
+
+    Vrací:
+        pole 4 podílů pokusů, ve kterých cifra na dané pozici nebyla
+        uhodnuta (nebyla to bull), první prvek je první cifra
+    """
+    hits = np.zeros(len(_SHIFTS), dtype=np.int64)
+    n_guesses = 0
+    for _, records in read_chunks(filename, chunk_size):
+        is_start, game = _game_index(records)
+        guesses = records["guess"][~is_start]
+        secrets = records["guess"][game[~is_start]]
+        diff = guesses ^ secrets
+        for position, shift in enumerate(_SHIFTS):
+            hits[position] += np.count_nonzero((diff >> shift & 0xF) == 0)
+        n_guesses += len(guesses)
+    if n_guesses == 0:
+        return np.full(len(_SHIFTS), np.nan)
+    return 1 - hits / n_guesses
+
+
+def find_inconsistent(filename, chunk_size=10 ** 6):
+    """Hledá pokusy, které odporují verdiktům dřívějších pokusů téže hry.
+
+    Pokus je konzistentní, pokud by s každým dřívějším pokusem hry dal
+    stejný verdikt, jaký dostal dřívější pokus (mohl by tedy být tajným
+    číslem). Pokusy se porovnávají vektorově po odstupech: nejprve
+    s předchozím pokusem, pak s předminulým atd. až po nejdelší hru bloku.
+
+    Vrací:
+        generátor polí čísel záznamů (pořadí v souboru) nekonzistentních
+        pokusů, jedno pole za blok
+    """
+    for first, records in read_chunks(filename, chunk_size):
+        is_start, game = _game_index(records)
+        guesses, verdicts = records["guess"], records["verdict"]
+        inconsistent = np.zeros(len(records), dtype=bool)
+        lag = 1
+        while lag < len(records):
+            same_game = game[lag:] == game[:-lag]
+            if not same_game.any():
+                break
+            # dvojice (pokus, dřívější pokus), značky se neporovnávají
+            pairs = np.flatnonzero(same_game & ~is_start[:-lag])
+            current = pairs + lag
+            mismatch = (_verdict_bytes(guesses[current], guesses[pairs])
+                        != verdicts[pairs])
+            inconsistent[current[mismatch]] = True
+            lag += 1
+        yield first + np.flatnonzero(inconsistent)
+
+
+def replay(filename, chunk_size=10 ** 6):
+    """Prochází zaznamenané hry.
+
+    Vrací:
+        generátor instancí TranscriptGame(secret_num, start_time, guesses),
+        kde start_time je unixový čas začátku hry a guesses list trojic
+        (pokus, Verdict, sekundy od předchozího záznamu)
+    """
+    for _, records in read_chunks(filename, chunk_size):
+        records = records.tolist()
+        game = None
+        for guess, verdict, delta_ms in records:
+            if verdict == GAME_START:
+                if game is not None:
+                    yield game
+                game = TranscriptGame(unpack_number(guess), delta_ms, [])
+            else:
+                game.guesses.append((unpack_number(guess),
+                                     Verdict(verdict >> 4, verdict & 0xF),
+                                     delta_ms / 1000))
+        if game is not None:
+            yield game
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analysis of a Bulls and Cows game transcript.")
+    parser.add_argument("file", help="transcript file in the program folder")
+    parser.add_argument("--chunk-size", type=int, default=10 ** 6,
+                        help="records read at once")
+    args = parser.parse_args()
+
+    n_games = n_records = 0
+    for _, records in read_chunks(args.file, args.chunk_size):
+        n_games += np.count_nonzero(records["verdict"] == GAME_START)
+        n_records += len(records)
+    n_guesses = n_records - n_games
+    n_inconsistent = sum(len(indices) for indices
+                         in find_inconsistent(args.file, args.chunk_size))
+    difficulty = position_difficulty(args.file, args.chunk_size)
+
+    print(f"{n_games} games, {n_guesses} guesses")
+    print("Missed digit by position: " +
+          " ".join(f"{share:.1%}" for share in difficulty))
+    share = n_inconsistent / n_guesses if n_guesses else 0
+    print(f"Guesses inconsistent with earlier verdicts: {n_inconsistent} "
+          f"({share:.1%})")
+
+
+if __name__ == "__main__":
+    main()
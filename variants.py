@@ -0,0 +1,324 @@
+"""Modul s obecnými variantami hry Bulls and Cows.
+
+Varianta (třída Variant) je daná délkou čísla, počtem symbolů (základem
+číselné soustavy, až 36 symbolů 0-9 a a-z), tím, jestli se symboly smí
+opakovat, a tím, jestli číslo smí začínat nulou. Klasická hra je
+Variant(length=4, base=10, repeats=False, leading_zero=False).
+
+Čísla se kódují do jednoho integeru, každá cifra zabírá 'bits' bitů
+(první cifra v nejvyšších bitech). Platná tajná čísla jsou seřazená
+lexikograficky a číslo se z pořadí vypočítá přímo (unrank), takže prostor
+tajných čísel se nikdy nevytváří celý: prochází se po blocích
+(enumerate) a kandidáti odpovídající dosavadním verdiktům se filtrují
+proudově (candidates). Zvládá tak i prostory s desítkami milionů čísel.
+
+    Typické použití:
+
+    variant = Variant(length=5, base=16, repeats=True)
+    engine = VariantEngine(variant)
+    verdict = engine.guess("1a2b3")  # Verdict(bulls=.., cows=..)
+
+    # kandidáti odpovídající verdiktům, po blocích
+    history = [(variant.pack("1a2b3"), verdict)]
+    for chunk in variant.candidates(history):
+        ...
+
+    nebo z příkazové řádky (hra v terminálu):
+
+    python variants.py --length 5 --base 16 --repeats
+"""
+
+
+import argparse
+from math import perm
+
+import numpy as np
+
+from game import BullsAndCows, InvalidGuessError, Verdict
+
+
+SYMBOLS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# hodnota symbolu podle kódu znaku (255 pro neplatné znaky)
+_SYMBOL_VALUES = np.full(128, 255, dtype=np.uint8)
+_SYMBOL_VALUES[[ord(symbol) for symbol in SYMBOLS]] = np.arange(len(SYMBOLS))
+_SYMBOL_VALUES = _SYMBOL_VALUES.tobytes()
+
+# počet jedniček v bytu
+_POPCOUNT8 = np.array([bin(byte).count("1") for byte in range(256)],
+                      dtype=np.uint8)
+
+
+def _popcount(values):
+    # počet jedniček v každém prvku pole typu int64
+    values = np.ascontiguousarray(values, dtype=np.int64)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(
+        *values.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class Variant:
+    """Pravidla varianty hry Bulls and Cows.
+
+    Atributy:
+        length: počet cifer čísla
+        base: počet symbolů (2 až 36)
+        repeats: bool, jestli se symboly smí opakovat
+        leading_zero: bool, jestli číslo smí začínat nulou
+        bits: počet bitů jedné cifry v zakódovaném čísle
+        size: počet platných tajných čísel
+    """
+
+    def __init__(self, length=4, base=10, repeats=False, leading_zero=False):
+        """Vyvolává:
+            ValueError: neplatná kombinace parametrů."""
+        if not 2 <= base <= len(SYMBOLS):
+            raise ValueError(f"'base' must be between 2 and {len(SYMBOLS)}!")
+        if length < 1:
+            raise ValueError("'length' must be positive!")
+        if not repeats and length > base:
+            raise ValueError("Without repeats 'length' must not exceed "
+                             "'base'!")
+        self.length = length
+        self.base = base
+        self.repeats = repeats
+        self.leading_zero = leading_zero
+        self.bits = (base - 1).bit_length()
+        if length * self.bits > 63:
+            raise ValueError("Numbers of this variant do not fit into "
+                             "64 bits!")
+
+        self._shifts = [self.bits * (length - 1 - position)
+                        for position in range(length)]
+        self._digit_mask = (1 << self.bits) - 1
+        # počet možných prvních cifer a počet pokračování pro každou pozici
+        self._first_choices = base if leading_zero else base - 1
+        if repeats:
+            self._blocks = [base ** (length - 1 - position)
+                            for position in range(length)]
+        else:
+            self._blocks = [perm(base - 1 - position, length - 1 - position)
+                            for position in range(length)]
+        self.size = self._first_choices * self._blocks[0]
+
+    def __repr__(self):
+        return (f"Variant(length={self.length}, base={self.base}, "
+                f"repeats={self.repeats}, leading_zero={self.leading_zero})")
+
+    def pack(self, number):
+        """Zakóduje číslo (string) do integeru."""
+        packed = 0
+        for char in number.lower():
+            packed = packed << self.bits | _SYMBOL_VALUES[ord(char)]
+        return packed
+
+    def unpack(self, packed):
+        """Vrátí číslo (string) zakódované metodou pack."""
+        return "".join(SYMBOLS[packed >> shift & self._digit_mask]
+                       for shift in self._shifts)
+
+    def digits(self, packed):
+        """Vrátí pole cifer tvaru (N, length) ze zakódovaných čísel."""
+        packed = np.asarray(packed, dtype=np.int64)
+        return np.stack([packed >> shift & self._digit_mask
+                         for shift in self._shifts], axis=-1)
+
+    def _masks(self, packed):
+        # masky přítomných symbolů zakódovaných čísel (pole int64)
+        packed = np.asarray(packed, dtype=np.int64)
+        masks = np.zeros(packed.shape, dtype=np.int64)
+        for shift in self._shifts:
+            masks |= np.left_shift(1, packed >> shift & self._digit_mask)
+        return masks
+
+    def validate(self, guess):
+        """Zkontroluje hádané číslo, vrátí tuple chybových hlášek (prázdný
+        pro validní číslo)."""
+        guess = guess.lower()
+        values = [_SYMBOL_VALUES[ord(char)] if ord(char) < 128 else 255
+                  for char in guess]
+        errors = []
+        if not all(value < self.base for value in values):
+            if self.base == 10:
+                errors.append("Guess must be a number!")
+            else:
+                errors.append(f"Guess may only contain symbols "
+                              f"'{SYMBOLS[:self.base]}'!")
+        if len(guess) != self.length:
+            errors.append(f"Guessed number must be {self.length} "
+                          f"digits long!")
+        if not self.leading_zero and guess[:1] == "0":
+            errors.append("Guessed number must not start with a 0!")
+        if not self.repeats and len(guess) != len(set(guess)):
+            errors.append("Each digit must be unique!")
+        return tuple(errors)
+
+    def unrank(self, indices):
+        """Vrátí zakódovaná tajná čísla podle jejich pořadí.
+
+        Argumenty:
+            indices: integer nebo pole pořadí (0 až size - 1)
+
+        Vrací:
+            integer nebo pole int64 (podle argumentu)
+        """
+        scalar = np.ndim(indices) == 0
+        rest = np.atleast_1d(np.asarray(indices, dtype=np.int64)).copy()
+        if np.any((rest < 0) | (rest >= self.size)):
+            raise IndexError(f"Index out of range 0..{self.size - 1}!")
+
+        packed = np.zeros(len(rest), dtype=np.int64)
+        used = np.zeros((len(rest), self.base), dtype=bool)
+        if not self.leading_zero:
+            used[:, 0] = True  # první cifra nesmí být nula
+        for position, (block, shift) in enumerate(zip(self._blocks,
+                                                      self._shifts)):
+            choice, rest = np.divmod(rest, block)
+            if self.repeats:
+                digit = choice + (position == 0 and not self.leading_zero)
+            else:
+                # 'choice'-tý dosud nepoužitý symbol
+                available = np.cumsum(~used, axis=1)
+                digit = np.argmax(available > choice[:, None], axis=1)
+                used[np.arange(len(rest)), digit] = True
+                if position == 0 and not self.leading_zero:
+                    used[:, 0] = False
+            packed |= digit.astype(np.int64) << shift
+        return int(packed[0]) if scalar else packed
+
+    def enumerate(self, chunk_size=1 << 16, start=0, stop=None):
+        """Postupně vrací bloky (pole int64) zakódovaných tajných čísel
+        v lexikografickém pořadí."""
+        stop = self.size if stop is None else min(stop, self.size)
+        for chunk_start in range(start, stop, chunk_size):
+            yield self.unrank(np.arange(chunk_start,
+                                        min(chunk_start + chunk_size, stop)))
+
+    def random_secret(self, rng=None):
+        """Vrátí náhodné zakódované tajné číslo (rng je numpy Generator)."""
+        rng = np.random.default_rng() if rng is None else rng
+        return self.unrank(int(rng.integers(self.size)))
+
+    def score(self, guess, secret):
+        """Vyhodnotí zakódované hádané číslo, vrátí Verdict."""
+        bulls, cows = self.score_packed(np.array([guess]), np.array([secret]))
+        return Verdict(int(bulls[0, 0]), int(cows[0, 0]))
+
+    def score_packed(self, guesses, secrets):
+        """Vyhodnotí najednou všechny dvojice zakódovaných čísel.
+
+        Vrací:
+            dvojici matic (bulls, cows) typu uint8 tvaru (N, M)
+        """
+        guesses = np.asarray(guesses, dtype=np.int64)
+        secrets = np.asarray(secrets, dtype=np.int64)
+        guess_digits, secret_digits = self.digits(guesses), \
+            self.digits(secrets)
+
+        bulls = np.zeros((len(guesses), len(secrets)), dtype=np.uint8)
+        for position in range(self.length):
+            bulls += np.equal.outer(guess_digits[:, position],
+                                    secret_digits[:, position])
+
+        if self.repeats:
+            # společné symboly: součet minim počtů výskytů symbolů
+            common = np.zeros_like(bulls)
+            for symbol in range(self.base):
+                common += np.minimum.outer(
+                    (guess_digits == symbol).sum(axis=1, dtype=np.uint8),
+                    (secret_digits == symbol).sum(axis=1, dtype=np.uint8))
+        else:
+            common = _popcount(np.bitwise_and.outer(self._masks(guesses),
+                                                    self._masks(secrets)))
+        return bulls, common - bulls
+
+    def candidates(self, history, chunk_size=1 << 16):
+        """Postupně vrací bloky tajných čísel odpovídajících všem verdiktům.
+
+        Argumenty:
+            history: sekvence dvojic (zakódovaný pokus, Verdict)
+            chunk_size: počet tajných čísel zpracovaných najednou
+        """
+        guesses = np.array([guess for guess, _ in history], dtype=np.int64)
+        verdicts = np.array([tuple(verdict) for _, verdict in history],
+                            dtype=np.uint8).reshape(-1, 2)
+        for chunk in self.enumerate(chunk_size):
+            if len(guesses):
+                bulls, cows = self.score_packed(guesses, chunk)
+                consistent = ((bulls == verdicts[:, :1])
+                              & (cows == verdicts[:, 1:])).all(axis=0)
+                chunk = chunk[consistent]
+            if len(chunk):
+                yield chunk
+
+
+class VariantEngine:
+    """Hra zvolené varianty bez vstupu a výstupu (viz game.GameEngine).
+
+    Atributy:
+        variant: instance třídy Variant
+        secret_num: string, tajné číslo
+        n_guesses: počet validních pokusů
+        won: bool, jestli bylo číslo uhodnuto
+    """
+    __slots__ = ("variant", "secret_num", "n_guesses", "won", "_secret")
+
+    def __init__(self, variant, secret_num=None, rng=None):
+        """Argumenty:
+            variant: instance třídy Variant
+            secret_num:
+                Tajné číslo (string). Pokud není zadáno, vygeneruje se
+                náhodně pomocí 'rng' (numpy Generator).
+        """
+        self.variant = variant
+        if secret_num is None:
+            self._secret = variant.random_secret(rng)
+        else:
+            errors = variant.validate(secret_num)
+            if errors:
+                raise InvalidGuessError(errors)
+            self._secret = variant.pack(secret_num)
+        self.secret_num = variant.unpack(self._secret)
+        self.n_guesses = 0
+        self.won = False
+
+    def guess(self, guess):
+        """Vyhodnotí pokus a vrátí Verdict(bulls, cows).
+
+        Vyvolává:
+            InvalidGuessError: pokus není validní, nezapočítá se.
+            RuntimeError: hra už byla vyhraná.
+        """
+        if self.won:
+            raise RuntimeError("The game is already won!")
+
+        errors = self.variant.validate(guess)
+        if errors:
+            raise InvalidGuessError(errors)
+
+        self.n_guesses += 1
+        verdict = self.variant.score(self.variant.pack(guess), self._secret)
+        if verdict.bulls == self.variant.length:
+            self.won = True
+        return verdict
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulls and Cows with custom rules.")
+    parser.add_argument("--length", type=int, default=4)
+    parser.add_argument("--base", type=int, default=10,
+                        help=f"number of symbols (2-{len(SYMBOLS)})")
+    parser.add_argument("--repeats", action="store_true",
+                        help="allow repeated symbols")
+    parser.add_argument("--leading-zero", action="store_true",
+                        help="allow a leading zero")
+    args = parser.parse_args()
+
+    variant = Variant(args.length, args.base, args.repeats, args.leading_zero)
+    print(f"{variant}: {variant.size} possible secrets")
+    game = BullsAndCows(engine=VariantEngine(variant))
+    game.play()
+
+
+if __name__ == "__main__":
+    main()